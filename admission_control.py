@@ -0,0 +1,148 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, NamedTuple, Optional
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of admitted"""
+
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(f"Request rejected ({reason}), retry after {retry_after}s")
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class Reservation(NamedTuple):
+    """A slot (``waiter`` is None) or a place in the queue, taken by ``reserve``"""
+    waiter: Optional[asyncio.Future]
+
+
+class AdmissionController:
+    """Concurrency limit with a bounded wait queue for expensive routes.
+
+    Up to ``limit`` requests run at once and up to ``max_queue`` more wait for a
+    slot, for at most ``queue_timeout`` seconds. Anything beyond that is rejected
+    immediately with a ``Retry-After`` estimate based on the observed service time.
+
+    With a ``target_latency`` the limit adapts (AIMD): it shrinks by 10% whenever a
+    request takes longer than the target and grows by roughly one per window of
+    fast requests while the limit is saturated, within ``[min_limit, max_limit]``.
+
+    Routes that hand work to a background job call ``reserve`` before responding,
+    so they are shed (or queued) right away, and pass the reservation to ``admit``
+    in the job.
+    """
+
+    def __init__(self, max_concurrent: int = 4, max_queue: int = 8, queue_timeout: float = 30.0,
+                 target_latency: Optional[float] = None, min_limit: int = 1, max_limit: int = 32):
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.target_latency = target_latency
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, max_concurrent)
+        self._limit = float(max_concurrent)
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._avg_latency: Optional[float] = None
+
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    @asynccontextmanager
+    async def admit(self, reservation: Optional[Reservation] = None):
+        """Hold a slot for the duration of the block, or raise AdmissionRejected"""
+        await self._acquire(reservation or self.reserve())
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - started)
+
+    def reserve(self) -> Reservation:
+        """Take a free slot or a place in the queue now, or raise AdmissionRejected"""
+        if self._active < self.limit and not self._waiters:
+            self._active += 1
+            self.admitted += 1
+            return Reservation(None)
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise AdmissionRejected(self._retry_after(), "queue full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        return Reservation(waiter)
+
+    def is_idle(self) -> bool:
+        return self._active == 0 and not self._waiters
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self._active,
+            "queued": len(self._waiters),
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "avg_latency_seconds": round(self._avg_latency, 3) if self._avg_latency is not None else None,
+        }
+
+    async def _acquire(self, reservation: Reservation):
+        waiter = reservation.waiter
+        if waiter is None:
+            return
+
+        try:
+            # A released slot is handed over by resolving the future, so _active is
+            # already counted for us when it completes
+            await asyncio.wait_for(waiter, timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected_timeout += 1
+            raise AdmissionRejected(self._retry_after(), "queue timeout")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was handed over just as the client went away; pass it on
+                self._release_slot()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        self.admitted += 1
+
+    def _release(self, latency: float):
+        if self._avg_latency is None:
+            self._avg_latency = latency
+        else:
+            self._avg_latency = 0.8 * self._avg_latency + 0.2 * latency
+
+        if self.target_latency is not None:
+            if latency > self.target_latency:
+                self._limit = max(float(self.min_limit), self._limit * 0.9)
+            elif self._active >= self.limit:
+                self._limit = min(float(self.max_limit), self._limit + 1 / self._limit)
+
+        self._release_slot()
+
+    def _release_slot(self):
+        self._active -= 1
+        # Hand free slots straight to waiters so queued requests keep FIFO order
+        while self._waiters and self._active < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._active += 1
+                waiter.set_result(None)
+
+    def _retry_after(self) -> int:
+        # Time for the requests ahead of a newcomer to drain through the current limit
+        service_time = self._avg_latency if self._avg_latency is not None else self.queue_timeout
+        ahead = len(self._waiters) + 1
+        return max(1, math.ceil(service_time * ahead / self.limit))
@@ -1,7 +1,28 @@
 import os
+import json
 import requests
-from typing import Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 from models import UserInput, ScriptType, Tone, BeliefOrientation, VoicePreference
+from session_sections import SECTION_INSTRUCTION, SECTION_NAMES, SECTION_TITLES, strip_section_markers, susceptibility_level
+
+GEMINI_MODEL_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash"
+
+# Generic (name-free) opening played instantly in express mode while the personalized
+# session is generated. The pauses are rendered as local silence, so they are free.
+EXPRESS_OPENING = " ".join([
+    "Find a comfortable position and allow yourself to settle in.",
+    "[pause]",
+    "Let your eyes close whenever you're ready, and simply notice your breathing.",
+    "[pause]",
+    "Take a deep breath in... <break time=\"4s\" /> hold it gently... <break time=\"2s\" /> and slowly breathe out.",
+    "<break time=\"6s\" />",
+    "Again, breathing in... <break time=\"4s\" /> holding... <break time=\"2s\" /> and letting it all go.",
+    "<break time=\"6s\" />",
+    "One more time, a slow, deep breath in... <break time=\"4s\" /> and out, releasing any tension with the breath.",
+    "<break time=\"6s\" />",
+    "Now let your breathing find its own natural, easy rhythm. With each breath, feel yourself becoming more relaxed and at peace.",
+    "<break time=\"8s\" />",
+])
 
 class AIScriptGenerator:
     def __init__(self, gemini_api_key: Optional[str] = None):
@@ -17,8 +38,57 @@ class AIScriptGenerator:
         else:
             return self._generate_with_templates(user_input)
     
-    def _generate_with_ai(self, user_input: UserInput) -> str:
-        """Generate hypnosis script using Gemini AI with the comprehensive prompt from prompt.txt"""
+    def stream_script(self, user_input: UserInput) -> Iterator[str]:
+        """Yield the script in text chunks as Gemini produces them.
+        
+        Falls back to the template script (as a single chunk) when AI is unavailable
+        or the request fails before any text was produced. Failures after text has
+        been yielded are raised, since the partial script can no longer be replaced.
+        """
+        if not (self.use_ai and self.gemini_api_key):
+            yield self._generate_with_templates(user_input)
+            return
+        
+        prompt = self._build_prompt(user_input)
+        if prompt is None:
+            yield self._generate_with_templates(user_input)
+            return
+        
+        produced_text = False
+        try:
+            with requests.post(
+                f"{GEMINI_MODEL_URL}:streamGenerateContent?alt=sse&key={self.gemini_api_key}",
+                headers={"Content-Type": "application/json"},
+                json=self._request_body(prompt),
+                stream=True,
+                timeout=30
+            ) as response:
+                if response.status_code != 200:
+                    print(f"Warning: AI API error {response.status_code}, using template fallback")
+                    yield self._generate_with_templates(user_input)
+                    return
+                
+                # Server-sent events: one "data: {json}" line per generated chunk
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    text = self._extract_text(json.loads(line[len("data:"):]))
+                    if text:
+                        produced_text = True
+                        yield text
+        except Exception as e:
+            if produced_text:
+                raise
+            print(f"Warning: AI generation failed ({str(e)}), using template fallback")
+            yield self._generate_with_templates(user_input)
+            return
+        
+        if not produced_text:
+            print("Warning: No content in AI response, using template fallback")
+            yield self._generate_with_templates(user_input)
+    
+    def _build_prompt(self, user_input: UserInput, with_section_markers: bool = True) -> Optional[str]:
+        """Fill prompt.txt with the user's data, or return None if the prompt file is missing"""
         
         # Use custom goal if provided, otherwise map script types to goals
         if user_input.custom_goal and user_input.custom_goal.strip():
@@ -32,87 +102,144 @@ class AIScriptGenerator:
             }
             goal = goal_mapping[user_input.script_type]
         
-        # Map predisposition scores to susceptibility levels
-        if user_input.predisposition_score:
-            if user_input.predisposition_score >= 65:
-                susceptibility = "High"
-            elif user_input.predisposition_score >= 45:
-                susceptibility = "Medium"
-            else:
-                susceptibility = "Low"
-        else:
-            susceptibility = "Medium"
+        susceptibility = susceptibility_level(user_input.predisposition_score)
         
         try:
             # Read the comprehensive prompt from prompt.txt
             with open('prompt.txt', 'r', encoding='utf-8') as f:
                 base_prompt = f.read()
-            
-            # Replace the placeholders in the prompt with user data, handling None values
-            prompt = base_prompt.replace('<name = ', f'<name = {user_input.name or "Guest"}')
-            prompt = prompt.replace('age = ', f'age = {user_input.age or "not specified"}')
-            prompt = prompt.replace('gender = ', f'gender = {user_input.gender.value if user_input.gender else "not specified"}')
-            prompt = prompt.replace('personality = ', f'personality = {user_input.personality or "not specified"}')
-            prompt = prompt.replace('belief orientation = ', f'belief orientation = {user_input.belief_orientation.value if user_input.belief_orientation else "neutral"}')
-            prompt = prompt.replace('tone = ', f'tone = {user_input.tone.value if user_input.tone else "calmed"}')
-            prompt = prompt.replace('poetic-literary =', f'poetic-literary = {user_input.voice_preference == VoicePreference.POETRY_LITERARY}')
-            prompt = prompt.replace('authoritative-permissive = ', f'authoritative-permissive = permissive')
-            prompt = prompt.replace('susceptibility =', f'susceptibility = {susceptibility}')
-            prompt = prompt.replace('goal =  >', f'goal = {goal}>')
-            
         except FileNotFoundError:
             print("Warning: prompt.txt not found, using fallback generation")
+            return None
+        
+        # Replace the placeholders in the prompt with user data, handling None values
+        prompt = base_prompt.replace('<name = ', f'<name = {user_input.name or "Guest"}')
+        prompt = prompt.replace('age = ', f'age = {user_input.age or "not specified"}')
+        prompt = prompt.replace('gender = ', f'gender = {user_input.gender.value if user_input.gender else "not specified"}')
+        prompt = prompt.replace('personality = ', f'personality = {user_input.personality or "not specified"}')
+        prompt = prompt.replace('belief orientation = ', f'belief orientation = {user_input.belief_orientation.value if user_input.belief_orientation else "neutral"}')
+        prompt = prompt.replace('tone = ', f'tone = {user_input.tone.value if user_input.tone else "calmed"}')
+        prompt = prompt.replace('poetic-literary =', f'poetic-literary = {user_input.voice_preference == VoicePreference.POETRY_LITERARY}')
+        prompt = prompt.replace('authoritative-permissive = ', f'authoritative-permissive = permissive')
+        prompt = prompt.replace('susceptibility =', f'susceptibility = {susceptibility}')
+        prompt = prompt.replace('goal =  >', f'goal = {goal}>')
+        if user_input.express:
+            prompt += (
+                "\n\nThe listener has already heard this opening, read by the same voice: "
+                f"\"{EXPRESS_OPENING}\" Continue directly from it: do not greet them again or repeat "
+                "the breathing exercise, and start the induction where the opening leaves off."
+            )
+        return prompt + SECTION_INSTRUCTION if with_section_markers else prompt
+    
+    def _request_body(self, prompt: str) -> dict:
+        return {
+            "contents": [{
+                "parts": [{
+                    "text": prompt
+                }]
+            }],
+            "generationConfig": {
+                "temperature": 0.7,
+                "maxOutputTokens": 4000,
+                "topP": 0.9,
+                "topK": 40
+            }
+        }
+    
+    def _extract_text(self, result: dict) -> str:
+        if 'candidates' in result and len(result['candidates']) > 0:
+            parts = result['candidates'][0].get('content', {}).get('parts', [])
+            return "".join(part.get('text', '') for part in parts)
+        return ""
+    
+    def _generate_with_ai(self, user_input: UserInput) -> str:
+        """Generate hypnosis script using Gemini AI with the comprehensive prompt from prompt.txt"""
+        
+        prompt = self._build_prompt(user_input)
+        if prompt is None:
             return self._generate_with_templates(user_input)
 
+        return self._call_gemini(prompt) or self._generate_with_templates(user_input)
+    
+    def _call_gemini(self, prompt: str) -> Optional[str]:
+        """Return Gemini's text for the prompt, or None (after logging why) so callers can fall back"""
         try:
             # Call Gemini API with the prompt from file
             response = requests.post(
-                f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={self.gemini_api_key}",
+                f"{GEMINI_MODEL_URL}:generateContent?key={self.gemini_api_key}",
                 headers={"Content-Type": "application/json"},
-                json={
-                    "contents": [{
-                        "parts": [{
-                            "text": prompt
-                        }]
-                    }],
-                    "generationConfig": {
-                        "temperature": 0.7,
-                        "maxOutputTokens": 4000,
-                        "topP": 0.9,
-                        "topK": 40
-                    }
-                },
+                json=self._request_body(prompt),
                 timeout=30
             )
             
             if response.status_code == 200:
-                result = response.json()
-                if 'candidates' in result and len(result['candidates']) > 0:
-                    return result['candidates'][0]['content']['parts'][0]['text'].strip()
+                text = self._extract_text(response.json())
+                if text:
+                    return text.strip()
                 else:
                     print("Warning: No content in AI response, using template fallback")
-                    return self._generate_with_templates(user_input)
+                    return None
             else:
                 print(f"Warning: AI API error {response.status_code}, using template fallback")
-                return self._generate_with_templates(user_input)
+                return None
                 
         except Exception as e:
             print(f"Warning: AI generation failed ({str(e)}), using template fallback")
-            return self._generate_with_templates(user_input)
+            return None
+    
+    def generate_section(self, user_input: UserInput, section: str, current_sections: Dict[str, str]) -> str:
+        """Regenerate a single stage of an existing script.
+        
+        ``current_sections`` holds the text of the other stages, so the new stage
+        can pick up where the previous one ends and lead into the next.
+        """
+        if self.use_ai and self.gemini_api_key:
+            prompt = self._build_prompt(user_input, with_section_markers=False)
+            if prompt is not None:
+                prompt += self._section_instruction(section, current_sections)
+                text = self._call_gemini(prompt)
+                if text:
+                    return strip_section_markers(text)
+        
+        return " ".join(dict(self._template_sections(user_input))[section])
+    
+    def _section_instruction(self, section: str, current_sections: Dict[str, str]) -> str:
+        index = SECTION_NAMES.index(section)
+        instruction = (
+            f"\n\nThe rest of this script has already been written. Write only the {SECTION_TITLES[section]} "
+            f"stage, without any stage markers."
+        )
+        if index > 0 and SECTION_NAMES[index - 1] in current_sections:
+            instruction += f" It must continue naturally from the end of the previous stage: \"{current_sections[SECTION_NAMES[index - 1]][-400:]}\""
+        if index + 1 < len(SECTION_NAMES) and SECTION_NAMES[index + 1] in current_sections:
+            instruction += f" It must lead naturally into the next stage, which begins: \"{current_sections[SECTION_NAMES[index + 1]][:400]}\""
+        return instruction
     
     def _generate_with_templates(self, user_input: UserInput) -> str:
         """Fallback template-based generation with graceful handling of missing data"""
+        return " ".join(
+            f"[[{section}]] " + " ".join(script_parts)
+            for section, script_parts in self._template_sections(user_input)
+        )
+    
+    def _template_sections(self, user_input: UserInput) -> List[Tuple[str, List[str]]]:
         # This is a simplified version of the original template system
-        script_parts = []
+        sections = []
         
         # Use name or default to "Guest"
         name = user_input.name or "Guest"
         
         # Induction
-        script_parts.append(f"Welcome, {name}. Find a comfortable position and allow yourself to settle in.")
-        script_parts.append("[pause]")
-        script_parts.append("Take a deep breath in... and slowly breathe out. With each breath, feel yourself becoming more relaxed and at peace.")
-        script_parts.append("[pause]")
+        script_parts = []
+        if user_input.express:
+            # Picks up after EXPRESS_OPENING, which already settled the listener
+            script_parts.append(f"That's it, {name}. Just keep breathing easily, more relaxed with every breath.")
+            script_parts.append("[pause]")
+        else:
+            script_parts.append(f"Welcome, {name}. Find a comfortable position and allow yourself to settle in.")
+            script_parts.append("[pause]")
+            script_parts.append("Take a deep breath in... and slowly breathe out. With each breath, feel yourself becoming more relaxed and at peace.")
+            script_parts.append("[pause]")
         
         # Predisposition adaptation
         if user_input.predisposition_score:
@@ -128,15 +255,19 @@ class AIScriptGenerator:
             script_parts.append("Allow yourself to relax at whatever pace feels natural and comfortable for you.")
         
         script_parts.append("[pause]")
+        sections.append(("induction", script_parts))
         
         # Deepening
+        script_parts = []
         script_parts.append("Now, going deeper with each breath. I'll count down from 10 to 1, and with each number, feel yourself sinking twice as deep into relaxation.")
         script_parts.append("10... deeper relaxed... 9... letting go completely... 8... sinking further down...")
         script_parts.append("[pause]")
         script_parts.append("7... 6... 5... deeper and deeper... 4... 3... 2... and 1... perfectly relaxed.")
         script_parts.append("[pause]")
+        sections.append(("deepening", script_parts))
         
         # Goal-specific suggestions based on script type
+        script_parts = []
         if user_input.script_type == ScriptType.FLIGHT:
             script_parts.append("Imagine yourself gently lifting off, becoming light as air, soaring above all earthly concerns.")
         elif user_input.script_type == ScriptType.NEXT:
@@ -157,9 +288,13 @@ class AIScriptGenerator:
             script_parts.append("Trust in your inner wisdom and natural ability to heal and grow.")
         
         script_parts.append("[pause]")
+        sections.append(("suggestion", script_parts))
         
         # Emergence
+        script_parts = []
         script_parts.append("In a moment, I'll count from 1 to 5, and at 5 you'll open your eyes feeling refreshed and wonderful.")
         script_parts.append("1... beginning to return... 2... energy flowing back... 3... becoming more aware... 4... almost there... and 5... eyes open, feeling great!")
+
+        sections.append(("emergence", script_parts))
         
-        return " ".join(script_parts)
\ No newline at end of file
+        return sections
@@ -0,0 +1,165 @@
+import os
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+# <break time="1.5s" /> from the AI prompt and [pause] from the template scripts
+PAUSE_MARKER = re.compile(r'<break\b[^>]*/>|\[pause\]', re.IGNORECASE)
+_BREAK_TIME = re.compile(r'time\s*=\s*["\']?\s*([\d.]+)\s*(ms|s)?', re.IGNORECASE)
+
+DEFAULT_PAUSE_SECONDS = 1.5
+# Longer pauses are almost certainly a malformed time from the model, not a deliberate silence
+MAX_PAUSE_SECONDS = 10.0
+
+# MPEG version bits -> (sample rates, Layer III bitrates in kbps, samples per frame)
+_MPEG_VERSIONS = {
+    0b11: ((44100, 48000, 32000), (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320), 1152),
+    0b10: ((22050, 24000, 16000), (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160), 576),
+    0b00: ((11025, 12000, 8000), (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160), 576),
+}
+_CHANNEL_MODE_MONO = 0b11
+
+
+class Mp3Format(NamedTuple):
+    version: int
+    sample_rate: int
+    bitrate_kbps: int
+    channel_mode: int
+
+    @property
+    def samples_per_frame(self) -> int:
+        return _MPEG_VERSIONS[self.version][2]
+
+
+# ElevenLabs' default output (mp3_44100_128, mono)
+DEFAULT_MP3_FORMAT = Mp3Format(version=0b11, sample_rate=44100, bitrate_kbps=128, channel_mode=_CHANNEL_MODE_MONO)
+
+
+def split_pauses(script: str) -> List[Tuple[str, float]]:
+    """Split a script into ``(text, pause_seconds)`` pairs.
+
+    Each pair is a run of speech followed by the silence that comes after it;
+    the markers themselves never end up in the text. Pauses are exact, except that
+    each one is capped at ``MAX_PAUSE_SECONDS`` (with a warning).
+    """
+    parts = []
+    text, pause = "", 0.0
+    position = 0
+    for match in PAUSE_MARKER.finditer(script):
+        chunk = script[position:match.start()].strip()
+        if chunk:
+            if text or pause:
+                parts.append((text, pause))
+            text, pause = chunk, 0.0
+        pause += pause_seconds(match.group(0))
+        position = match.end()
+
+    chunk = script[position:].strip()
+    if chunk:
+        if text or pause:
+            parts.append((text, pause))
+        text, pause = chunk, 0.0
+    if text or pause:
+        parts.append((text, pause))
+    for text, pause in parts:
+        if pause > MAX_PAUSE_SECONDS:
+            print(f"Warning: {pause:.1f}s pause shortened to {MAX_PAUSE_SECONDS:.1f}s")
+    return [(text, min(pause, MAX_PAUSE_SECONDS)) for text, pause in parts]
+
+
+def pause_seconds(marker: str) -> float:
+    """Duration of a single pause marker"""
+    match = _BREAK_TIME.search(marker)
+    if not match:
+        return DEFAULT_PAUSE_SECONDS
+    value = float(match.group(1))
+    if (match.group(2) or "s").lower() == "ms":
+        value /= 1000
+    return value
+
+
+def id3_size(audio: bytes) -> int:
+    """Size of the ID3v2 tag at the start of ``audio`` (0 if there is none)"""
+    if audio[:3] != b"ID3" or len(audio) < 10:
+        return 0
+    # ID3v2 size is a 28-bit syncsafe integer, excluding the 10 byte header
+    return 10 + ((audio[6] & 0x7F) << 21 | (audio[7] & 0x7F) << 14 | (audio[8] & 0x7F) << 7 | (audio[9] & 0x7F))
+
+
+def detect_mp3_format(audio: bytes) -> Optional[Mp3Format]:
+    """Read the stream parameters from the first MPEG Layer III frame header"""
+    offset = id3_size(audio)
+    while offset + 4 <= len(audio):
+        if audio[offset] == 0xFF and audio[offset + 1] & 0xE0 == 0xE0:
+            header = int.from_bytes(audio[offset:offset + 4], "big")
+            version = (header >> 19) & 0b11
+            layer = (header >> 17) & 0b11
+            bitrate_index = (header >> 12) & 0b1111
+            sample_rate_index = (header >> 10) & 0b11
+            if version in _MPEG_VERSIONS and layer == 0b01 and 0 < bitrate_index < 15 and sample_rate_index < 3:
+                sample_rates, bitrates, _ = _MPEG_VERSIONS[version]
+                return Mp3Format(
+                    version=version,
+                    sample_rate=sample_rates[sample_rate_index],
+                    bitrate_kbps=bitrates[bitrate_index],
+                    channel_mode=(header >> 6) & 0b11
+                )
+        offset += 1
+    return None
+
+
+def silent_mp3(seconds: float, mp3_format: Mp3Format = DEFAULT_MP3_FORMAT) -> bytes:
+    """Build MP3 frames that decode to ``seconds`` of silence, rounded to whole frames.
+
+    Every frame body is zeroed: with zero side information (main_data_begin and
+    part2_3_length both 0) it carries no audio data, so no encoder is needed.
+    Frames can be spliced directly between speech frames of the same format.
+    """
+    sample_rates, bitrates, samples_per_frame = _MPEG_VERSIONS[mp3_format.version]
+    frame_count = int(round(seconds * mp3_format.sample_rate / samples_per_frame))
+    if frame_count <= 0:
+        return b""
+
+    header = (
+        0x7FF << 21
+        | mp3_format.version << 19
+        | 0b01 << 17  # Layer III
+        | 1 << 16  # no CRC
+        | bitrates.index(mp3_format.bitrate_kbps) << 12
+        | sample_rates.index(mp3_format.sample_rate) << 10
+        | mp3_format.channel_mode << 6
+    )
+
+    # Bytes per frame is fractional (e.g. 417.96 at 44.1 kHz / 128 kbps); the
+    # padding bit spreads the remainder so the stream keeps its exact bitrate
+    bytes_per_frame_numerator = samples_per_frame // 8 * mp3_format.bitrate_kbps * 1000
+    frames = []
+    remainder = 0
+    for _ in range(frame_count):
+        frame_size, fraction = divmod(bytes_per_frame_numerator, mp3_format.sample_rate)
+        remainder += fraction
+        padding = 0
+        if remainder >= mp3_format.sample_rate:
+            remainder -= mp3_format.sample_rate
+            padding = 1
+        frame_header = (header | padding << 9).to_bytes(4, "big")
+        frames.append(frame_header + bytes(frame_size + padding - 4))
+    return b"".join(frames)
+
+
+def mp3_duration(audio: bytes) -> Optional[float]:
+    """Playing time of a constant-bitrate MP3 stream, or None if it is not MP3"""
+    mp3_format = detect_mp3_format(audio)
+    if mp3_format is None:
+        return None
+    return (len(audio) - id3_size(audio)) * 8 / (mp3_format.bitrate_kbps * 1000)
+
+
+def mp3_file_duration(filepath: str) -> Optional[float]:
+    """Like ``mp3_duration``, but only reads the tag header and first frame of the file"""
+    with open(filepath, "rb") as f:
+        tag_size = id3_size(f.read(10))
+        f.seek(tag_size)
+        mp3_format = detect_mp3_format(f.read(4096))
+    if mp3_format is None:
+        return None
+    return (os.path.getsize(filepath) - tag_size) * 8 / (mp3_format.bitrate_kbps * 1000)
@@ -0,0 +1,167 @@
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Optional, Set
+
+from models import AudioVariant
+
+try:
+    # Ships a static ffmpeg build, for hosts where it can't be installed system-wide
+    import imageio_ffmpeg
+except ImportError:
+    imageio_ffmpeg = None
+
+
+class VariantSpec(NamedTuple):
+    name: str
+    suffix: str  # appended to the source file's stem
+    mime_type: str
+    bitrate_kbps: int
+    ffmpeg_args: List[str]
+
+
+# Speech needs far less than the 128 kbps MP3 we get from TTS
+VARIANT_SPECS = [
+    VariantSpec("opus", ".opus.ogg", "audio/ogg; codecs=opus", 32,
+                ["-c:a", "libopus", "-b:a", "32k", "-application", "voip", "-f", "ogg"]),
+    VariantSpec("mp3_low", "_48k.mp3", "audio/mpeg", 48,
+                ["-c:a", "libmp3lame", "-b:a", "48k", "-ac", "1", "-f", "mp3"]),
+    VariantSpec("hls", "_hls/index.m3u8", "application/vnd.apple.mpegurl", 48,
+                ["-c:a", "aac", "-b:a", "48k", "-ac", "1", "-f", "hls", "-hls_time", "10",
+                 "-hls_playlist_type", "vod", "-hls_segment_filename", "{output_dir}/segment_%03d.ts"]),
+]
+
+
+class AudioVariantTranscoder:
+    """Produces low-bitrate and HLS variants of generated MP3s in a bounded background pool.
+
+    Jobs are queued with ffmpeg and never awaited by request handlers. Each variant is
+    written to a temporary path and moved into place when complete, so a variant's URL
+    only resolves once it is fully playable. ffmpeg comes from the PATH, or else from
+    the imageio-ffmpeg package; without either, or when the pool already has
+    ``max_pending`` sessions waiting, no variants are produced.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: int = 16):
+        self.ffmpeg_path = shutil.which("ffmpeg") or self._bundled_ffmpeg()
+        self.enabled = self.ffmpeg_path is not None
+        self.max_workers = max_workers or int(os.getenv("TRANSCODE_WORKERS", "2"))
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="transcode")
+        self._lock = threading.Lock()
+        self._pending: Set[str] = set()
+        self._failed: Set[str] = set()
+
+        if not self.enabled:
+            print("Warning: ffmpeg not found, audio variants disabled")
+
+    def submit(self, audio_url: str) -> List[AudioVariant]:
+        """Queue transcoding of a generated MP3 and return the variants it will produce"""
+        if not self._transcodable(audio_url):
+            return []
+
+        with self._lock:
+            if audio_url not in self._pending and not self._all_ready(audio_url):
+                if len(self._pending) >= self.max_pending:
+                    print(f"Warning: transcode queue full, skipping variants for {audio_url}")
+                    return []
+                self._pending.add(audio_url)
+                self._executor.submit(self._transcode_all, audio_url)
+        return self.variants(audio_url)
+
+    def variants(self, audio_url: str) -> List[AudioVariant]:
+        """Describe the variants of a generated MP3 and whether each is ready yet"""
+        if not self._transcodable(audio_url):
+            return []
+
+        variants = []
+        for spec in VARIANT_SPECS:
+            variant_url = self._variant_url(audio_url, spec)
+            if variant_url in self._failed:
+                continue
+            variants.append(AudioVariant(
+                name=spec.name,
+                url=variant_url,
+                mime_type=spec.mime_type,
+                bitrate_kbps=spec.bitrate_kbps,
+                ready=os.path.exists(variant_url.lstrip("/"))
+            ))
+        return variants
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _bundled_ffmpeg() -> Optional[str]:
+        if imageio_ffmpeg is None:
+            return None
+        try:
+            return imageio_ffmpeg.get_ffmpeg_exe()
+        except Exception:
+            return None
+
+    def _transcodable(self, audio_url: str) -> bool:
+        return self.enabled and audio_url.endswith(".mp3") and os.path.exists(audio_url.lstrip("/"))
+
+    def _all_ready(self, audio_url: str) -> bool:
+        # Variants that already failed once are not retried on every poll
+        return all(
+            os.path.exists(variant_url.lstrip("/")) or variant_url in self._failed
+            for variant_url in (self._variant_url(audio_url, spec) for spec in VARIANT_SPECS)
+        )
+
+    def _variant_url(self, audio_url: str, spec: VariantSpec) -> str:
+        return audio_url[:-len(".mp3")] + spec.suffix
+
+    def _transcode_all(self, audio_url: str):
+        try:
+            for spec in VARIANT_SPECS:
+                try:
+                    self._transcode(audio_url, spec)
+                except Exception as e:
+                    print(f"Warning: {spec.name} transcoding failed for {audio_url} ({str(e)})")
+                    with self._lock:
+                        self._failed.add(self._variant_url(audio_url, spec))
+        finally:
+            with self._lock:
+                self._pending.discard(audio_url)
+
+    def _transcode(self, audio_url: str, spec: VariantSpec):
+        source = audio_url.lstrip("/")
+        target = self._variant_url(audio_url, spec).lstrip("/")
+        if os.path.exists(target):
+            return
+
+        if spec.name == "hls":
+            # The playlist references its segments, so the whole directory is swapped in at once
+            final_dir = os.path.dirname(target)
+            work_dir = final_dir + ".tmp"
+            shutil.rmtree(work_dir, ignore_errors=True)
+            os.makedirs(work_dir)
+            args = [arg.format(output_dir=work_dir) for arg in spec.ffmpeg_args]
+            try:
+                self._run_ffmpeg(source, args, os.path.join(work_dir, os.path.basename(target)))
+                shutil.rmtree(final_dir, ignore_errors=True)
+                os.replace(work_dir, final_dir)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+        else:
+            work_path = target + ".tmp"
+            try:
+                self._run_ffmpeg(source, spec.ffmpeg_args, work_path)
+                os.replace(work_path, target)
+            finally:
+                if os.path.exists(work_path):
+                    os.remove(work_path)
+
+    def _run_ffmpeg(self, source: str, args: List[str], output: str):
+        result = subprocess.run(
+            [self.ffmpeg_path, "-nostdin", "-hide_banner", "-loglevel", "error", "-y", "-i", source, "-vn"]
+            + args + [output],
+            capture_output=True,
+            timeout=600
+        )
+        if result.returncode != 0:
+            raise Exception(result.stderr.decode("utf-8", errors="replace").strip() or f"ffmpeg exited {result.returncode}")
@@ -0,0 +1,43 @@
+"""Benchmark HypnosisGenerator personalization cost as the trait lexicon grows.
+
+Run with ``python bench_personalization.py``. Per-script time should stay roughly
+flat from the built-in lexicon up to thousands of synthetic rules, since the
+personality text is scanned once by the compiled matcher.
+"""
+import random
+import timeit
+
+from models import UserInput
+from hypnosis_generator import HypnosisGenerator
+from trait_rules import PERSONALITY_RULES, TraitMatcher, TraitRule
+
+PERSONALITY = (
+    "Curious, somewhat anxious before presentations, very active on weekends, "
+    "analytical at work but creative in the evenings, a bit of a perfectionist."
+)
+
+
+def synthetic_rules(count: int):
+    rng = random.Random(count)
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+    for index in range(count):
+        keywords = tuple("".join(rng.choice(alphabet) for _ in range(rng.randint(5, 12))) for _ in range(3))
+        yield TraitRule(keywords, f"Synthetic phrase {index}.")
+
+
+def main():
+    user_input = UserInput(name="Alex", personality=PERSONALITY, predisposition_score=72, predisposition_level="High")
+    generator = HypnosisGenerator()
+    runs = 2000
+
+    print(f"{'rules':>7} {'keywords':>9} {'us/script':>10}")
+    for extra in (0, 100, 1000, 5000):
+        rules = PERSONALITY_RULES + list(synthetic_rules(extra))
+        generator.trait_matcher = TraitMatcher(rules)
+        seconds = min(timeit.repeat(lambda: generator.generate_script(user_input), number=runs, repeat=3))
+        keywords = sum(len(rule.keywords) for rule in rules)
+        print(f"{len(rules):>7} {keywords:>9} {seconds / runs * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from models import UserInput, Tone, VoicePreference, HypnosisResponse, ExpressOpening, ExpressSessionStatus
+from ai_script_generator import EXPRESS_OPENING
+from voice_synthesizer_simple import VoiceSynthesizerSimple
+from audio_silence import mp3_duration, PAUSE_MARKER
+from admission_control import AdmissionRejected
+
+
+class ExpressSessionManager:
+    """Two-tier sessions: a shared template opening now, the personalized session later.
+
+    The opening is rendered once per voice and reused from disk, so it can start
+    playing as soon as the request returns. The personalized remainder (generated
+    with ``express=True`` so it continues after the opening) runs as a background
+    job that clients poll; they switch over when the opening ends. A job shed by
+    admission control fails with ``retry_after`` set, so the client can retry it.
+    """
+
+    def __init__(self, voice_synthesizer: VoiceSynthesizerSimple,
+                 generate: Callable[[UserInput], Awaitable[HypnosisResponse]],
+                 job_ttl_seconds: float = 3600, max_jobs: int = 1000):
+        self.voice_synthesizer = voice_synthesizer
+        self.generate = generate
+        self.job_ttl_seconds = job_ttl_seconds
+        self.max_jobs = max_jobs
+        self._openings: Dict[Tuple[Tone, VoicePreference], ExpressOpening] = {}
+        self._opening_locks: Dict[Tuple[Tone, VoicePreference], asyncio.Lock] = {}
+        self._jobs: Dict[str, ExpressSessionStatus] = {}
+        self._job_created: Dict[str, float] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def opening(self, tone: Tone, voice_type: VoicePreference) -> Optional[ExpressOpening]:
+        """The pre-rendered opening for a voice, rendering it on first use"""
+        if not self.voice_synthesizer.use_elevenlabs:
+            return None
+
+        key = (tone, voice_type)
+        if key in self._openings:
+            return self._openings[key]
+
+        lock = self._opening_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if key not in self._openings:
+                # The text hash keeps an edited opening from being served from an old file
+                text_hash = hashlib.sha256(EXPRESS_OPENING.encode()).hexdigest()[:12]
+                filename = f"express_opening_{voice_type.value}_{tone.value}_{text_hash}.mp3"
+                filepath = f"static/audio/{filename}"
+                if os.path.exists(filepath):
+                    with open(filepath, "rb") as f:
+                        audio = f.read()
+                    audio_url = f"/static/audio/{filename}"
+                else:
+                    audio = await self.voice_synthesizer.synthesize_audio(EXPRESS_OPENING, tone, voice_type)
+                    audio_url = self.voice_synthesizer.save_audio(audio, filename)
+                self._openings[key] = ExpressOpening(
+                    script=" ".join(PAUSE_MARKER.sub(" ", EXPRESS_OPENING).split()),
+                    audio_url=audio_url,
+                    duration=mp3_duration(audio)
+                )
+        return self._openings[key]
+
+    async def warm(self):
+        """Render every voice's opening ahead of the first express request"""
+        for voice_type, tones in self.voice_synthesizer.voice_mappings.items():
+            for tone in tones:
+                try:
+                    await self.opening(tone, voice_type)
+                except Exception as e:
+                    print(f"Warning: failed to pre-render express opening ({str(e)})")
+
+    def start(self, user_input: UserInput,
+              generate: Optional[Callable[[UserInput], Awaitable[HypnosisResponse]]] = None) -> str:
+        """Queue generation of the personalized remainder and return its job id.
+
+        ``generate`` replaces the manager's default for this job, e.g. to use an
+        admission reservation taken by the request handler.
+        """
+        job_id = self._new_job(ExpressSessionStatus(job_id="", status="pending"))
+        self._tasks[job_id] = asyncio.get_running_loop().create_task(
+            self._run(job_id, user_input.model_copy(update={"express": True}), generate or self.generate)
+        )
+        return job_id
+
+    def finished(self, session: HypnosisResponse) -> str:
+        """Register a session that is already complete (e.g. pre-generated) as a ready job"""
+        return self._new_job(ExpressSessionStatus(job_id="", status="ready", session=session))
+
+    def _new_job(self, status: ExpressSessionStatus) -> str:
+        self._prune()
+        job_id = uuid.uuid4().hex
+        self._jobs[job_id] = status.model_copy(update={"job_id": job_id})
+        self._job_created[job_id] = time.time()
+        return job_id
+
+    def status(self, job_id: str) -> Optional[ExpressSessionStatus]:
+        return self._jobs.get(job_id)
+
+    async def _run(self, job_id: str, user_input: UserInput,
+                   generate: Callable[[UserInput], Awaitable[HypnosisResponse]]):
+        try:
+            session = await generate(user_input)
+            self._jobs[job_id] = ExpressSessionStatus(job_id=job_id, status="ready", session=session)
+        except AdmissionRejected as e:
+            self._jobs[job_id] = ExpressSessionStatus(
+                job_id=job_id,
+                status="failed",
+                error="Server is busy generating other sessions, please retry shortly",
+                retry_after=e.retry_after
+            )
+        except Exception as e:
+            # HTTPExceptions from the generation route carry their message in detail
+            error = str(getattr(e, "detail", None) or e)
+            self._jobs[job_id] = ExpressSessionStatus(job_id=job_id, status="failed", error=error)
+        finally:
+            self._tasks.pop(job_id, None)
+
+    def _prune(self):
+        # Finished jobs are only kept long enough for the client to pick them up
+        now = time.time()
+        for job_id, created in list(self._job_created.items()):
+            expired = now - created > self.job_ttl_seconds
+            if (expired or len(self._jobs) >= self.max_jobs) and job_id not in self._tasks:
+                self._jobs.pop(job_id, None)
+                self._job_created.pop(job_id, None)
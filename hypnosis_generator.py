@@ -1,8 +1,37 @@
 from models import UserInput, ScriptType, Tone, BeliefOrientation, VoicePreference
+from trait_rules import PERSONALITY_RULES, TraitMatcher, score_band
 import random
 
+# Predisposition-adapted phrases, indexed by score band (see trait_rules.SCORE_BAND_EDGES)
+OPENING_BY_BAND = (
+    "There's no pressure here, just gentle relaxation at your own natural pace.",
+    "Take your time to settle in, allowing yourself to become more comfortable with each breath.",
+    "You have a natural ability to let go and allow this peaceful experience to unfold.",
+    "Your mind naturally opens to this experience, like a flower blooming in the warm sunlight.",
+)
+DEEPENING_BY_BAND = (
+    "Simply enjoying this peaceful feeling, relaxing as much as feels comfortable.",
+    "Continuing to relax more deeply, at exactly the right pace for you.",
+    "Going deeper now, twice as deep, feeling completely safe and comfortable.",
+    "Going deeper now, twice as deep, feeling completely safe and comfortable.",
+)
+REINFORCEMENT_BY_BAND = (
+    "Consider these positive thoughts as gentle suggestions that you can accept at your own pace.",
+    "Allow these positive ideas to settle gently into your awareness, taking root and growing stronger.",
+    "Allow these positive ideas to settle gently into your awareness, taking root and growing stronger.",
+    "These positive suggestions integrate effortlessly into your subconscious mind, becoming part of your natural way of being.",
+)
+AWAKENING_BY_BAND = (
+    None,
+    None,
+    "Take a moment to fully integrate this experience before opening your eyes completely alert and refreshed.",
+    "Take a moment to fully integrate this experience before opening your eyes completely alert and refreshed.",
+)
+
 class HypnosisGenerator:
     def __init__(self):
+        # Compiled once; matching cost stays flat as the lexicon grows
+        self.trait_matcher = TraitMatcher(PERSONALITY_RULES)
         self.script_templates = {
             ScriptType.TEST: {
                 "intro": [
@@ -100,26 +129,19 @@ class HypnosisGenerator:
         # Personalize the script
         script_parts = []
         
+        # A score of 0 is treated like no score, as before
+        band = score_band(user_input.predisposition_score) if user_input.predisposition_score else None
+        
         # Add intro
         intro = random.choice(template["intro"]).format(name=user_input.name)
         script_parts.append(intro)
         
         # Add predisposition-based customization
-        if user_input.predisposition_score and user_input.predisposition_level:
-            if user_input.predisposition_score >= 80:
-                script_parts.append("Your mind naturally opens to this experience, like a flower blooming in the warm sunlight.")
-            elif user_input.predisposition_score >= 65:
-                script_parts.append("You have a natural ability to let go and allow this peaceful experience to unfold.")
-            elif user_input.predisposition_score >= 45:
-                script_parts.append("Take your time to settle in, allowing yourself to become more comfortable with each breath.")
-            else:
-                script_parts.append("There's no pressure here, just gentle relaxation at your own natural pace.")
+        if band is not None and user_input.predisposition_level:
+            script_parts.append(OPENING_BY_BAND[band])
         
-        # Add personality-based customization
-        if "anxious" in user_input.personality.lower() or "nervous" in user_input.personality.lower():
-            script_parts.append("Notice how your breathing naturally slows and deepens, washing away any tension or worry.")
-        elif "energetic" in user_input.personality.lower() or "active" in user_input.personality.lower():
-            script_parts.append("Even your vibrant energy can find perfect balance in this peaceful state.")
+        # Add personality-based customization (one pass over the text for all traits)
+        script_parts.extend(self.trait_matcher.match(user_input.personality))
         
         # Add belief-oriented language
         if user_input.belief_orientation == BeliefOrientation.SPIRITUAL:
@@ -132,13 +154,8 @@ class HypnosisGenerator:
         script_parts.append(deepening)
         
         # Additional deepening based on predisposition
-        if user_input.predisposition_score:
-            if user_input.predisposition_score >= 65:
-                script_parts.append("Going deeper now, twice as deep, feeling completely safe and comfortable.")
-            elif user_input.predisposition_score >= 45:
-                script_parts.append("Continuing to relax more deeply, at exactly the right pace for you.")
-            else:
-                script_parts.append("Simply enjoying this peaceful feeling, relaxing as much as feels comfortable.")
+        if band is not None:
+            script_parts.append(DEEPENING_BY_BAND[band])
         
         # Add tone-specific language
         if user_input.tone == Tone.SPIRITUAL:
@@ -153,13 +170,8 @@ class HypnosisGenerator:
         script_parts.append(suggestions)
         
         # Add predisposition-specific reinforcement
-        if user_input.predisposition_score:
-            if user_input.predisposition_score >= 80:
-                script_parts.append("These positive suggestions integrate effortlessly into your subconscious mind, becoming part of your natural way of being.")
-            elif user_input.predisposition_score >= 45:
-                script_parts.append("Allow these positive ideas to settle gently into your awareness, taking root and growing stronger.")
-            else:
-                script_parts.append("Consider these positive thoughts as gentle suggestions that you can accept at your own pace.")
+        if band is not None:
+            script_parts.append(REINFORCEMENT_BY_BAND[band])
         
         # Add voice preference influence
         if user_input.voice_preference == VoicePreference.POETRY_LITERARY:
@@ -172,7 +184,7 @@ class HypnosisGenerator:
         script_parts.append(awakening)
         
         # Final awakening based on predisposition
-        if user_input.predisposition_score and user_input.predisposition_score >= 65:
-            script_parts.append("Take a moment to fully integrate this experience before opening your eyes completely alert and refreshed.")
+        if band is not None and AWAKENING_BY_BAND[band]:
+            script_parts.append(AWAKENING_BY_BAND[band])
         
         return " ".join(script_parts)
\ No newline at end of file
@@ -1,14 +1,22 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse
 import os
+import asyncio
 from dotenv import load_dotenv
 
-from models import UserInput, HypnosisResponse
+from models import UserInput, HypnosisResponse, ScriptType, SessionList, SessionRecord, AudioVariant, Tone
+from models import ExpressSessionResponse, ExpressSessionStatus
 from ai_script_generator import AIScriptGenerator
 from voice_synthesizer_simple import VoiceSynthesizerSimple
 from predisposition_test import PredispositionTest
-from typing import List
+from script_pipeline import ScriptPipeline, GeneratedSession
+from session_store import SessionStore
+from audio_variants import AudioVariantTranscoder
+from admission_control import AdmissionController, AdmissionRejected, Reservation
+from pregeneration import PresetPool, PregeneratedSession
+from express_sessions import ExpressSessionManager
+from typing import List, Optional
 
 load_dotenv()
 
@@ -16,9 +24,45 @@ app = FastAPI(title="HypnosAI", description="AI-powered hypnosis generation")
 
 script_generator = AIScriptGenerator(gemini_api_key=os.getenv("GEMINI_API_KEY"))
 voice_synthesizer = VoiceSynthesizerSimple(api_key=os.getenv("ELEVENLABS_API_KEY"))
+script_pipeline = ScriptPipeline(script_generator, voice_synthesizer)
 predisposition_test = PredispositionTest()
+session_store = SessionStore()
+audio_transcoder = AudioVariantTranscoder()
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Only the generation route is admission-controlled; the quiz and history routes stay cheap
+target_latency = os.getenv("GENERATION_TARGET_LATENCY")
+generation_admission = AdmissionController(
+    max_concurrent=int(os.getenv("GENERATION_MAX_CONCURRENT", "4")),
+    max_queue=int(os.getenv("GENERATION_MAX_QUEUE", "8")),
+    queue_timeout=float(os.getenv("GENERATION_QUEUE_TIMEOUT", "30")),
+    target_latency=float(target_latency) if target_latency else None
+)
+# Popular generic presets are pre-generated while no user generation is running
+preset_pool = PresetPool(script_pipeline, is_idle=generation_admission.is_idle)
+
+async def _generate_admitted(user_input: UserInput, reservation: Optional[Reservation] = None) -> HypnosisResponse:
+    # Express jobs report AdmissionRejected in their status, so it is not turned into a 503 here
+    async with generation_admission.admit(reservation):
+        return await _generate_session(user_input)
+
+express_sessions = ExpressSessionManager(voice_synthesizer, generate=_generate_admitted)
+
+# static/audio may be a symlink onto the persistent disk (see render.yaml)
+app.mount("/static", StaticFiles(directory="static", follow_symlink=True), name="static")
+
+@app.on_event("startup")
+async def start_pregeneration():
+    preset_pool.start()
+    # Express openings are rendered once per voice, ahead of the first express request
+    asyncio.get_running_loop().create_task(express_sessions.warm())
+
+@app.on_event("shutdown")
+async def stop_pregeneration():
+    await preset_pool.stop()
+
+@app.on_event("shutdown")
+async def stop_transcoding():
+    audio_transcoder.shutdown()
 
 @app.get("/", response_class=HTMLResponse)
 async def root():
@@ -36,23 +80,138 @@ async def calculate_score(request: dict):
 
 @app.post("/generate-hypnosis", response_model=HypnosisResponse)
 async def generate_hypnosis(user_input: UserInput):
+    # A ready-made session needs no generation capacity, so it skips admission control
+    pregenerated = preset_pool.take(user_input)
+    if pregenerated is not None:
+        return await _generate_session(user_input, pregenerated)
+    
     try:
-        script = script_generator.generate_script(user_input)
-        audio_url = await voice_synthesizer.generate_voice(
-            script=script,
-            tone=user_input.tone,
-            voice_type=user_input.voice_preference
+        async with generation_admission.admit():
+            return await _generate_session(user_input)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy generating other sessions, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)}
         )
+
+@app.post("/generate-hypnosis/express", response_model=ExpressSessionResponse)
+async def generate_hypnosis_express(user_input: UserInput):
+    # Generic requests can be answered by a ready-made full session, with no opening needed
+    pregenerated = preset_pool.take(user_input)
+    if pregenerated is not None:
+        session = await _generate_session(user_input, pregenerated)
+        job_id = express_sessions.finished(session)
+        return ExpressSessionResponse(job_id=job_id, opening=None, status_url=f"/api/express/{job_id}")
+    
+    try:
+        opening = await express_sessions.opening(user_input.tone or Tone.CALMED, user_input.voice_preference)
+    except Exception as e:
+        # Without an opening the client simply waits for the personalized session
+        print(f"Warning: express opening unavailable ({str(e)})")
+        opening = None
+    
+    # Take the job's slot or queue place before responding, so a full server refuses
+    # before the opening plays and queued express jobs count towards the limits.
+    # Nothing is awaited until the job has started, so the reservation can't leak.
+    try:
+        reservation = generation_admission.reserve()
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy generating other sessions, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    
+    job_id = express_sessions.start(user_input, lambda job_input: _generate_admitted(job_input, reservation))
+    return ExpressSessionResponse(job_id=job_id, opening=opening, status_url=f"/api/express/{job_id}")
+
+@app.get("/api/express/{job_id}", response_model=ExpressSessionStatus)
+async def get_express_status(job_id: str):
+    status = express_sessions.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Express session not found")
+    return status
+
+@app.get("/api/admission-stats")
+async def admission_stats():
+    return generation_admission.stats()
+
+@app.get("/api/pregeneration-stats")
+async def pregeneration_stats():
+    return preset_pool.stats()
+
+async def _generate_session(user_input: UserInput, pregenerated: Optional[PregeneratedSession] = None) -> HypnosisResponse:
+    try:
+        previous = session_store.get_owned(user_input.previous_session_id, user_input.user_id) if user_input.previous_session_id else None
+        if pregenerated is not None:
+            generated = GeneratedSession(pregenerated.script, pregenerated.audio_url, pregenerated.sections)
+        elif previous is not None:
+            # Follow-up to an earlier session: only the sections touched by the change are redone
+            generated = await script_pipeline.regenerate(user_input, previous)
+        else:
+            # Synthesis of finished sentences overlaps with the rest of the script being written
+            generated = await script_pipeline.generate(user_input)
+        script, audio_url = generated.script, generated.audio_url
+        duration_estimate = len(script.split()) * 0.6  # rough estimate
+        if previous is not None and audio_url == previous.audio_url:
+            # Nothing changed, so the previous session is handed back instead of stored twice
+            session_id = previous.session_id
+        else:
+            try:
+                session_id = session_store.save(user_input, script, audio_url, duration_estimate, generated.sections)
+            except Exception as e:
+                # The session is still usable, it just won't show up in the history
+                print(f"Warning: failed to store session ({str(e)})")
+                session_id = None
+        
+        # Lower-bitrate and HLS copies are rendered in the background; clients poll for readiness
+        variants = audio_transcoder.submit(audio_url)
         
         return HypnosisResponse(
             script=script,
             audio_url=audio_url,
-            duration_estimate=len(script.split()) * 0.6,  # rough estimate
-            script_type=user_input.script_type
+            duration_estimate=duration_estimate,
+            script_type=user_input.script_type,
+            session_id=session_id,
+            variants=variants,
+            regenerated_sections=generated.regenerated_sections
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/sessions", response_model=SessionList)
+async def list_sessions(
+    user_id: str = Query(min_length=1),
+    script_type: Optional[ScriptType] = None,
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0)
+):
+    sessions, total = session_store.list(user_id=user_id, script_type=script_type, limit=limit, offset=offset)
+    return SessionList(sessions=sessions, total=total, limit=limit, offset=offset)
+
+@app.get("/api/sessions/{session_id}", response_model=SessionRecord)
+async def get_session(session_id: str, user_id: str = Query(min_length=1)):
+    session = session_store.get_owned(session_id, user_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if session.user_input.express:
+        # Express sessions only store the personalized part; replays start with the shared opening
+        try:
+            tone = session.user_input.tone or Tone.CALMED
+            session.opening = await express_sessions.opening(tone, session.user_input.voice_preference)
+        except Exception as e:
+            print(f"Warning: express opening unavailable ({str(e)})")
+    return session
+
+@app.get("/api/sessions/{session_id}/variants", response_model=List[AudioVariant])
+async def get_session_variants(session_id: str, user_id: str = Query(min_length=1)):
+    session = session_store.get_owned(session_id, user_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    # Replays of sessions from before variants existed get them queued on first request
+    return audio_transcoder.submit(session.audio_url)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
+from datetime import datetime
 
 class Gender(str, Enum):
     MALE = "male"
@@ -29,6 +30,7 @@ class VoicePreference(str, Enum):
     AUTHENTIC_PRIMAL = "authentic_primal"
 
 class UserInput(BaseModel):
+    user_id: Optional[str] = Field(default=None, max_length=64)
     name: Optional[str] = Field(default="Guest", max_length=50)
     age: Optional[int] = Field(default=None, ge=18, le=100)
     gender: Optional[Gender] = Field(default=None)
@@ -41,9 +43,67 @@ class UserInput(BaseModel):
     predisposition_score: Optional[float] = Field(default=None, ge=0, le=100)
     predisposition_level: Optional[str] = Field(default=None)
     custom_goal: Optional[str] = Field(default=None, max_length=200)
+    previous_session_id: Optional[str] = Field(default=None, max_length=64)
+    # Set for express sessions, whose script continues after the shared template opening
+    express: bool = False
+
+class SessionSection(BaseModel):
+    name: str
+    script: str
+    audio_url: str
+
+class AudioVariant(BaseModel):
+    name: str
+    url: str
+    mime_type: str
+    bitrate_kbps: int
+    ready: bool = False
 
 class HypnosisResponse(BaseModel):
     script: str
     audio_url: str
     duration_estimate: float
-    script_type: ScriptType
\ No newline at end of file
+    script_type: ScriptType
+    session_id: Optional[str] = None
+    variants: List[AudioVariant] = []
+    regenerated_sections: Optional[List[str]] = None
+
+class ExpressOpening(BaseModel):
+    script: str
+    audio_url: str
+    duration: Optional[float] = None
+
+class ExpressSessionResponse(BaseModel):
+    job_id: str
+    opening: Optional[ExpressOpening] = None
+    status_url: str
+
+class ExpressSessionStatus(BaseModel):
+    job_id: str
+    status: str  # "pending", "ready" or "failed"
+    session: Optional[HypnosisResponse] = None
+    error: Optional[str] = None
+    retry_after: Optional[int] = None  # set when the job was shed; the request can be retried after this many seconds
+
+class SessionSummary(BaseModel):
+    session_id: str
+    created_at: datetime
+    name: Optional[str] = None
+    script_type: ScriptType
+    tone: Optional[Tone] = None
+    voice_preference: VoicePreference
+    audio_url: str
+    duration_estimate: float
+    audio_duration: Optional[float] = None
+
+class SessionRecord(SessionSummary):
+    script: str
+    user_input: UserInput
+    sections: List[SessionSection] = []
+    opening: Optional[ExpressOpening] = None  # played before the stored audio for express sessions
+
+class SessionList(BaseModel):
+    sessions: List[SessionSummary]
+    total: int
+    limit: int
+    offset: int
@@ -0,0 +1,214 @@
+import asyncio
+import os
+import time
+from collections import Counter, deque
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional
+
+from models import UserInput, ScriptType, Tone, VoicePreference, BeliefOrientation, SessionSection
+from session_sections import susceptibility_level
+from script_pipeline import ScriptPipeline
+
+# Representative score for each susceptibility level, used when pre-generating
+_LEVEL_SCORES = {"High": 75.0, "Medium": 55.0, "Low": 30.0}
+
+
+class PresetKey(NamedTuple):
+    script_type: ScriptType
+    tone: Tone
+    voice_preference: VoicePreference
+    susceptibility: str
+
+
+class PregeneratedSession(NamedTuple):
+    script: str
+    audio_url: str
+    sections: List[SessionSection]
+    created_at: float
+
+
+def preset_key(user_input: UserInput) -> Optional[PresetKey]:
+    """The preset a request corresponds to, or None if it carries personal details.
+
+    Only requests whose prompt would be identical to the preset's can be served from
+    the pool, so anything that ends up in the script (name, age, personality, goal...)
+    rules a request out. The Gemini prompt sees the predisposition score only as a
+    susceptibility level, so scores are grouped by level. The template fallback (no
+    Gemini key) is finer grained, using score bands at 45/65/80 and a separate branch
+    for no score, so there a served preset can differ slightly from what the request
+    alone would have produced.
+    """
+    if (user_input.name or "Guest") != "Guest":
+        return None
+    if user_input.age is not None or user_input.gender is not None:
+        return None
+    if user_input.personality or (user_input.custom_goal and user_input.custom_goal.strip()):
+        return None
+    if user_input.belief_orientation not in (None, BeliefOrientation.NEUTRAL):
+        return None
+    if user_input.express:
+        return None
+
+    return PresetKey(
+        script_type=user_input.script_type,
+        tone=user_input.tone or Tone.CALMED,
+        voice_preference=user_input.voice_preference,
+        susceptibility=susceptibility_level(user_input.predisposition_score)
+    )
+
+
+class PresetPool:
+    """Keeps ready-made sessions for the most requested presets.
+
+    Every generation request is counted against its preset. A background loop
+    refills the pool for the ``top_k`` presets, but only while ``is_idle`` reports
+    no user traffic and the hourly/daily generation caps have room; a run is
+    cancelled as soon as a user request arrives, so it never competes with one for
+    Gemini or TTS capacity. Sessions older than ``ttl_seconds`` are discarded (audio
+    files included) rather than served.
+    """
+
+    def __init__(self, pipeline: ScriptPipeline, is_idle: Callable[[], bool],
+                 enabled: Optional[bool] = None, top_k: Optional[int] = None,
+                 sessions_per_preset: Optional[int] = None, ttl_seconds: Optional[float] = None,
+                 max_per_hour: Optional[int] = None, max_per_day: Optional[int] = None,
+                 refill_interval: float = 5.0, idle_check_interval: float = 0.5):
+        self.pipeline = pipeline
+        self.is_idle = is_idle
+        self.enabled = enabled if enabled is not None else os.getenv("PREGEN_ENABLED", "false").lower() == "true"
+        self.top_k = top_k or int(os.getenv("PREGEN_TOP_K", "3"))
+        self.sessions_per_preset = sessions_per_preset or int(os.getenv("PREGEN_POOL_SIZE", "2"))
+        self.ttl_seconds = ttl_seconds or float(os.getenv("PREGEN_TTL_SECONDS", str(24 * 3600)))
+        self.max_per_hour = max_per_hour if max_per_hour is not None else int(os.getenv("PREGEN_MAX_PER_HOUR", "10"))
+        self.max_per_day = max_per_day if max_per_day is not None else int(os.getenv("PREGEN_MAX_PER_DAY", "50"))
+        self.refill_interval = refill_interval
+        self.idle_check_interval = idle_check_interval
+
+        self._demand: Counter = Counter()
+        self._pool: Dict[PresetKey, Deque[PregeneratedSession]] = {}
+        self._spend: Deque[float] = deque()  # start times of pre-generations in the last day
+        self._task: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.expired = 0
+        self.cancelled = 0
+
+    def take(self, user_input: UserInput) -> Optional[PregeneratedSession]:
+        """Record the request and hand out a fresh pre-generated session if one matches"""
+        key = preset_key(user_input)
+        if key is None:
+            return None
+
+        self._demand[key] += 1
+        sessions = self._pool.get(key)
+        while sessions:
+            session = sessions.popleft()
+            if time.time() - session.created_at <= self.ttl_seconds:
+                self.hits += 1
+                return session
+            self._discard(session)
+        self.misses += 1
+        return None
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._refill_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # The pool lives in memory, so its sessions could never be served after a restart
+        for sessions in self._pool.values():
+            while sessions:
+                self._delete_files(sessions.popleft())
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "generated": self.generated,
+            "expired": self.expired,
+            "cancelled": self.cancelled,
+            "pooled": {self._label(key): len(sessions) for key, sessions in self._pool.items() if sessions},
+            "top_presets": [(self._label(key), count) for key, count in self._demand.most_common(self.top_k)],
+        }
+
+    async def _refill_loop(self):
+        while True:
+            await asyncio.sleep(self.refill_interval)
+            try:
+                key = self._next_preset()
+                if key is not None and self.is_idle() and self._within_budget():
+                    await self._pregenerate_while_idle(key)
+            except Exception as e:
+                print(f"Warning: pre-generation failed ({str(e)})")
+
+    def _next_preset(self) -> Optional[PresetKey]:
+        """The most requested preset whose pool is not full"""
+        now = time.time()
+        for key, _ in self._demand.most_common(self.top_k):
+            sessions = self._pool.setdefault(key, deque())
+            while sessions and now - sessions[0].created_at > self.ttl_seconds:
+                self._discard(sessions.popleft())
+            if len(sessions) < self.sessions_per_preset:
+                return key
+        return None
+
+    def _within_budget(self) -> bool:
+        now = time.time()
+        while self._spend and now - self._spend[0] > 24 * 3600:
+            self._spend.popleft()
+        last_hour = sum(1 for started in self._spend if now - started <= 3600)
+        return last_hour < self.max_per_hour and len(self._spend) < self.max_per_day
+
+    async def _pregenerate_while_idle(self, key: PresetKey):
+        """Run a pre-generation, cancelling it as soon as user traffic arrives"""
+        task = asyncio.get_running_loop().create_task(self._pregenerate(key))
+        try:
+            while not task.done():
+                await asyncio.wait({task}, timeout=self.idle_check_interval)
+                if not task.done() and not self.is_idle():
+                    task.cancel()
+                    self.cancelled += 1
+        finally:
+            if not task.done():
+                task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        if not task.cancelled() and task.exception() is not None:
+            raise task.exception()
+
+    def _discard(self, session: PregeneratedSession):
+        self.expired += 1
+        self._delete_files(session)
+
+    @staticmethod
+    def _delete_files(session: PregeneratedSession):
+        for audio_url in [session.audio_url] + [section.audio_url for section in session.sections]:
+            try:
+                os.remove(audio_url.lstrip("/"))
+            except OSError:
+                pass
+
+    async def _pregenerate(self, key: PresetKey):
+        self._spend.append(time.time())
+        user_input = UserInput(
+            script_type=key.script_type,
+            tone=key.tone,
+            voice_preference=key.voice_preference,
+            predisposition_score=_LEVEL_SCORES[key.susceptibility]
+        )
+        generated = await self.pipeline.generate(user_input)
+        self._pool.setdefault(key, deque()).append(
+            PregeneratedSession(generated.script, generated.audio_url, generated.sections, time.time())
+        )
+        self.generated += 1
+
+    @staticmethod
+    def _label(key: PresetKey) -> str:
+        return f"{key.script_type.value}/{key.tone.value}/{key.voice_preference.value}/{key.susceptibility}"
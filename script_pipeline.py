@@ -0,0 +1,278 @@
+import asyncio
+import queue
+import re
+import threading
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Set
+
+from models import UserInput, SessionRecord, SessionSection
+from ai_script_generator import AIScriptGenerator
+from voice_synthesizer_simple import VoiceSynthesizerSimple
+from audio_silence import PAUSE_MARKER
+from session_sections import SECTION_MARKER, SECTION_NAMES, affected_sections, strip_section_markers
+
+# A section marker, a pause marker, or the end of a sentence once the whitespace after it has arrived
+_BOUNDARY = re.compile(
+    "|".join([SECTION_MARKER.pattern, PAUSE_MARKER.pattern, r'[.!?]+["\')\]]*\s+']),
+    re.IGNORECASE
+)
+
+
+class ScriptSegment(NamedTuple):
+    text: str
+    section: str
+
+
+class GeneratedSession(NamedTuple):
+    script: str
+    audio_url: str
+    sections: List[SessionSection]
+    regenerated_sections: Optional[List[str]] = None
+
+
+class ScriptSegmenter:
+    """Incrementally splits streamed script text into segments ready for synthesis.
+
+    A segment is closed at every pause marker (the marker stays at the end of the
+    segment it closes) and at the first sentence end once it holds at least
+    ``min_chars`` characters, so the TTS stage is not flooded with tiny requests.
+    Section markers close the current segment and are dropped; every segment is
+    tagged with the section it belongs to ("script" before the first marker).
+    Segments come out in script order and together cover all of its spoken text.
+    """
+
+    def __init__(self, min_chars: int = 200):
+        self.min_chars = min_chars
+        self._buffer = ""
+        self._pending = ""
+        self._section = "script"
+
+    def feed(self, text: str) -> List[ScriptSegment]:
+        """Add a chunk of streamed text and return the segments it completed"""
+        self._buffer += text
+        segments = []
+        consumed = 0
+
+        for match in _BOUNDARY.finditer(self._buffer):
+            section_match = SECTION_MARKER.fullmatch(match.group(0))
+            if section_match:
+                self._pending += self._buffer[consumed:match.start()]
+                consumed = match.end()
+                segments.extend(self._take_pending())
+                self._section = section_match.group(1).lower()
+                continue
+
+            self._pending += self._buffer[consumed:match.end()]
+            consumed = match.end()
+            if PAUSE_MARKER.fullmatch(match.group(0)) or len(self._pending.strip()) >= self.min_chars:
+                segments.extend(self._take_pending())
+
+        self._buffer = self._buffer[consumed:]
+        return segments
+
+    def flush(self) -> List[ScriptSegment]:
+        """Return whatever text is left once the stream has ended"""
+        self._pending += self._buffer
+        self._buffer = ""
+        return self._take_pending()
+
+    def _take_pending(self) -> List[ScriptSegment]:
+        segment = self._pending.strip()
+        self._pending = ""
+        return [ScriptSegment(segment, self._section)] if segment else []
+
+
+class ScriptPipeline:
+    """Overlaps Gemini script generation with ElevenLabs synthesis.
+
+    Gemini's streamed response is read on a worker thread and cut into segments,
+    which are handed to the voice synthesizer through a bounded queue as soon as
+    they close. When the queue is full the reader stops pulling from Gemini until
+    the TTS stage catches up.
+    """
+
+    def __init__(self, script_generator: AIScriptGenerator, voice_synthesizer: VoiceSynthesizerSimple,
+                 max_queued_segments: int = 4, min_segment_chars: int = 200):
+        self.script_generator = script_generator
+        self.voice_synthesizer = voice_synthesizer
+        self.max_queued_segments = max_queued_segments
+        self.min_segment_chars = min_segment_chars
+
+    async def generate(self, user_input: UserInput) -> GeneratedSession:
+        if not self.voice_synthesizer.use_elevenlabs:
+            # Nothing to overlap with: the fallback audio does not depend on the script
+            return await self._generate_sequential(user_input)
+
+        script_chunks: List[str] = []
+        streamed: List[ScriptSegment] = []
+        segments = self._stream_segments(user_input, script_chunks, streamed)
+        try:
+            try:
+                audio_parts = await self.voice_synthesizer.synthesize_pipelined(
+                    segments,
+                    tone=user_input.tone,
+                    voice_type=user_input.voice_preference
+                )
+            finally:
+                await segments.aclose()
+        except Exception as e:
+            print(f"Warning: pipelined generation failed ({str(e)}), using sequential generation")
+            return await self._generate_sequential(user_input)
+
+        # Each section keeps its own audio so it can be swapped out by regenerate()
+        section_texts: Dict[str, List[str]] = {}
+        section_audio: Dict[str, List[bytes]] = {}
+        for segment, audio in zip(streamed, audio_parts):
+            section_texts.setdefault(segment.section, []).append(segment.text)
+            section_audio.setdefault(segment.section, []).append(audio)
+        sections = [
+            SessionSection(
+                name=name,
+                script=" ".join(texts),
+                audio_url=self.voice_synthesizer.save_audio(b"".join(section_audio[name]))
+            )
+            for name, texts in section_texts.items()
+        ]
+
+        return GeneratedSession(
+            script=strip_section_markers("".join(script_chunks)),
+            audio_url=self.voice_synthesizer.save_audio(b"".join(audio_parts)),
+            sections=sections
+        )
+
+    async def regenerate(self, user_input: UserInput, previous: SessionRecord) -> GeneratedSession:
+        """Derive a session from a previous one, regenerating only the sections the change affects.
+
+        Unaffected sections keep their text and audio; affected ones are rewritten
+        against their neighbours, re-synthesized and spliced back in. If nothing is
+        affected the previous session is returned unchanged. Falls back to a
+        full generation when the previous session has no usable sections or the change
+        touches all of them (e.g. a different voice).
+        """
+        affected = affected_sections(
+            previous.user_input, user_input, {section.name: section.script for section in previous.sections}
+        )
+        if not affected:
+            # Same script as before, so the previous session is reused rather than re-spliced
+            return GeneratedSession(previous.script, previous.audio_url, previous.sections, regenerated_sections=[])
+
+        previous_names = [section.name for section in previous.sections]
+        if (not self.voice_synthesizer.use_elevenlabs or previous_names != list(SECTION_NAMES)
+                or len(affected) == len(SECTION_NAMES)):
+            return await self.generate(user_input)
+
+        try:
+            return await self._regenerate_sections(user_input, previous, affected)
+        except Exception as e:
+            print(f"Warning: incremental regeneration failed ({str(e)}), using full generation")
+            return await self.generate(user_input)
+
+    async def _regenerate_sections(self, user_input: UserInput, previous: SessionRecord,
+                                   affected: Set[str]) -> GeneratedSession:
+        texts = {section.name: section.script for section in previous.sections}
+        changed = [name for name in SECTION_NAMES if name in affected]
+        for name in changed:
+            texts[name] = await asyncio.to_thread(self.script_generator.generate_section, user_input, name, texts)
+
+        def previous_text(name: str) -> Optional[str]:
+            index = SECTION_NAMES.index(name)
+            return PAUSE_MARKER.sub(" ", texts[SECTION_NAMES[index - 1]])[-500:] if index else None
+
+        new_audio = await asyncio.gather(*(
+            self.voice_synthesizer.synthesize_audio(
+                texts[name], user_input.tone, user_input.voice_preference, previous_text(name)
+            )
+            for name in changed
+        ))
+        new_audio_by_name = dict(zip(changed, new_audio))
+
+        sections = []
+        audio_parts = []
+        for section in previous.sections:
+            if section.name in new_audio_by_name:
+                audio = new_audio_by_name[section.name]
+                section = SessionSection(
+                    name=section.name,
+                    script=texts[section.name],
+                    audio_url=self.voice_synthesizer.save_audio(audio)
+                )
+            else:
+                with open(section.audio_url.lstrip("/"), "rb") as f:
+                    audio = f.read()
+            sections.append(section)
+            audio_parts.append(audio)
+
+        return GeneratedSession(
+            script="\n\n".join(section.script for section in sections),
+            audio_url=self.voice_synthesizer.save_audio(b"".join(audio_parts)),
+            sections=sections,
+            regenerated_sections=changed
+        )
+
+    async def _generate_sequential(self, user_input: UserInput) -> GeneratedSession:
+        # The Gemini call blocks for up to its timeout, so keep it off the event loop
+        script = strip_section_markers(await asyncio.to_thread(self.script_generator.generate_script, user_input))
+        audio_url = await self.voice_synthesizer.generate_voice(
+            script=script,
+            tone=user_input.tone,
+            voice_type=user_input.voice_preference
+        )
+        return GeneratedSession(script=script, audio_url=audio_url, sections=[])
+
+    async def _stream_segments(self, user_input: UserInput, script_chunks: List[str],
+                               streamed: List[ScriptSegment]) -> AsyncIterator[str]:
+        segment_queue: "queue.Queue" = queue.Queue(maxsize=self.max_queued_segments)
+        stop = threading.Event()
+        producer = asyncio.create_task(
+            asyncio.to_thread(self._produce_segments, user_input, segment_queue, stop, script_chunks)
+        )
+
+        try:
+            while True:
+                item = await asyncio.to_thread(self._take, segment_queue, stop)
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                streamed.append(item)
+                yield item.text
+        finally:
+            # Stops the Gemini stream if synthesis failed or the request was cancelled
+            stop.set()
+            await asyncio.gather(producer, return_exceptions=True)
+
+    def _produce_segments(self, user_input: UserInput, segment_queue: "queue.Queue", stop: threading.Event,
+                          script_chunks: List[str]):
+        segmenter = ScriptSegmenter(min_chars=self.min_segment_chars)
+        chunks = self.script_generator.stream_script(user_input)
+        try:
+            for chunk in chunks:
+                script_chunks.append(chunk)
+                for segment in segmenter.feed(chunk):
+                    if not self._put(segment_queue, segment, stop):
+                        return
+            for segment in segmenter.flush():
+                if not self._put(segment_queue, segment, stop):
+                    return
+            self._put(segment_queue, None, stop)
+        except Exception as e:
+            self._put(segment_queue, e, stop)
+        finally:
+            # Closes the underlying HTTP response when we stop early
+            chunks.close()
+
+    def _put(self, segment_queue: "queue.Queue", item, stop: threading.Event) -> bool:
+        while not stop.is_set():
+            try:
+                segment_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _take(self, segment_queue: "queue.Queue", stop: threading.Event) -> Optional[object]:
+        while not stop.is_set():
+            try:
+                return segment_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
@@ -0,0 +1,90 @@
+import re
+from typing import Dict, Optional, Set
+
+from models import UserInput
+
+SECTION_NAMES = ("induction", "deepening", "suggestion", "emergence")
+SECTION_MARKER = re.compile(r'\[\[\s*(induction|deepening|suggestion|emergence)\s*\]\]', re.IGNORECASE)
+
+# Appended to the Gemini prompt so generated scripts can be split back into stages
+SECTION_INSTRUCTION = (
+    "\n\nBegin each of the four stages with its marker on a line of its own: "
+    "[[induction]], [[deepening]], [[suggestion]] and [[emergence]]. "
+    "Output nothing else besides the spoken text, the pauses and these markers."
+)
+
+# Which sections' text depends on each UserInput field. Fields that are not listed
+# (duration_minutes, predisposition_level, user_id...) do not change the script.
+# The prompt gives Gemini every field for the whole script, so this is where each
+# field is meant to shape the session, not a guarantee: after a personality or belief
+# change, the kept sections may still carry a little of the old framing. The name is
+# the exception, since a stale name is plainly wrong; affected_sections also redoes
+# every section that still mentions the previous one.
+FIELD_DEPENDENCIES: Dict[str, Set[str]] = {
+    "name": {"induction", "emergence"},
+    "age": set(SECTION_NAMES),
+    "gender": set(SECTION_NAMES),
+    "personality": {"deepening", "suggestion"},
+    "belief_orientation": {"suggestion"},
+    "script_type": {"suggestion"},
+    "custom_goal": {"suggestion"},
+    "predisposition_score": {"induction", "deepening"},
+    # These also select the TTS voice, so every section has to be re-synthesized anyway
+    "tone": set(SECTION_NAMES),
+    "voice_preference": set(SECTION_NAMES),
+    "express": set(SECTION_NAMES),
+}
+
+SECTION_TITLES = {
+    "induction": "Induction (Stage 1)",
+    "deepening": "Deepening (Stage 2)",
+    "suggestion": "Goal-Specific Suggestion Segment (Stage 3)",
+    "emergence": "Emergence (Stage 4)",
+}
+
+
+def strip_section_markers(script: str) -> str:
+    return re.sub(r'\n{3,}', "\n\n", SECTION_MARKER.sub("", script)).strip()
+
+
+def susceptibility_level(predisposition_score: Optional[float]) -> str:
+    """Map predisposition scores to the susceptibility levels used in the prompt"""
+    if predisposition_score:
+        if predisposition_score >= 65:
+            return "High"
+        elif predisposition_score >= 45:
+            return "Medium"
+        else:
+            return "Low"
+    return "Medium"
+
+
+def affected_sections(previous: UserInput, current: UserInput,
+                      previous_texts: Optional[Dict[str, str]] = None) -> Set[str]:
+    """Sections whose text must be regenerated to go from ``previous`` to ``current``.
+
+    ``previous_texts`` maps section names to their current text; without it, a name
+    change conservatively affects every section.
+    """
+    affected: Set[str] = set()
+    for field, sections in FIELD_DEPENDENCIES.items():
+        if _prompt_value(previous, field) != _prompt_value(current, field):
+            affected |= sections
+
+    previous_name = _prompt_value(previous, "name")
+    if previous_name != _prompt_value(current, "name"):
+        if previous_texts is None:
+            affected |= set(SECTION_NAMES)
+        else:
+            mention = re.compile(rf'\b{re.escape(previous_name)}\b', re.IGNORECASE)
+            affected |= {name for name, text in previous_texts.items() if mention.search(text)}
+    return affected
+
+
+def _prompt_value(user_input: UserInput, field: str):
+    if field == "predisposition_score":
+        # The prompt only sees the susceptibility level, so score changes within a level don't matter
+        return susceptibility_level(user_input.predisposition_score)
+    if field == "name":
+        return user_input.name or "Guest"
+    return getattr(user_input, field)
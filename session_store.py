@@ -0,0 +1,141 @@
+import os
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Optional, Tuple, List
+
+from models import UserInput, ScriptType, SessionSummary, SessionRecord, SessionSection
+from audio_silence import mp3_file_duration
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    user_id TEXT,
+    created_at TEXT NOT NULL,
+    script_type TEXT NOT NULL,
+    user_input TEXT NOT NULL,
+    script TEXT NOT NULL,
+    audio_url TEXT NOT NULL,
+    duration_estimate REAL NOT NULL,
+    audio_duration REAL,
+    sections TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_user_created ON sessions (user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_created ON sessions (created_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_type_created ON sessions (script_type, created_at);
+"""
+
+_SUMMARY_COLUMNS = "session_id, created_at, user_input, audio_url, duration_estimate, audio_duration"
+
+
+class SessionStore:
+    """SQLite-backed history of generated sessions so they can be replayed without regenerating"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("SESSION_DB_PATH", "data/sessions.db")
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # One shared connection; requests are short, so a lock is enough to serialize them
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            # Databases created before sections were stored lack the column
+            columns = [row["name"] for row in self._conn.execute("PRAGMA table_info(sessions)")]
+            if "sections" not in columns:
+                self._conn.execute("ALTER TABLE sessions ADD COLUMN sections TEXT")
+
+    def save(self, user_input: UserInput, script: str, audio_url: str, duration_estimate: float,
+             sections: Optional[List[SessionSection]] = None) -> str:
+        """Record a generated session and return its id"""
+        session_id = uuid.uuid4().hex
+        created_at = datetime.now(timezone.utc).isoformat()
+        audio_duration = self._audio_duration(audio_url)
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sessions (session_id, user_id, created_at, script_type, user_input, script,"
+                " audio_url, duration_estimate, audio_duration, sections) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    session_id,
+                    user_input.user_id,
+                    created_at,
+                    user_input.script_type.value,
+                    user_input.model_dump_json(),
+                    script,
+                    audio_url,
+                    duration_estimate,
+                    audio_duration,
+                    json.dumps([section.model_dump() for section in sections or []]),
+                )
+            )
+        return session_id
+
+    def get(self, session_id: str) -> Optional[SessionRecord]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_SUMMARY_COLUMNS}, script, sections FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        summary = self._summary(row)
+        return SessionRecord(
+            **summary.model_dump(),
+            script=row["script"],
+            user_input=UserInput.model_validate_json(row["user_input"]),
+            sections=[SessionSection(**section) for section in json.loads(row["sections"] or "[]")]
+        )
+
+    def get_owned(self, session_id: str, user_id: Optional[str]) -> Optional[SessionRecord]:
+        """Like ``get``, but only returns the session to the user who created it"""
+        # Sessions hold personal details, so this is the only way the API reads them
+        session = self.get(session_id)
+        if session is None or not user_id or session.user_input.user_id != user_id:
+            return None
+        return session
+
+    def list(self, user_id: str, script_type: Optional[ScriptType] = None,
+             limit: int = 20, offset: int = 0) -> Tuple[List[SessionSummary], int]:
+        """Return a page of a user's sessions, newest first, and the total number matching the filters"""
+        conditions = ["user_id = ?"]
+        params: list = [user_id]
+        if script_type is not None:
+            conditions.append("script_type = ?")
+            params.append(script_type.value)
+        where = f"WHERE {' AND '.join(conditions)}"
+
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM sessions {where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {_SUMMARY_COLUMNS} FROM sessions {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return [self._summary(row) for row in rows], total
+
+    def _summary(self, row: sqlite3.Row) -> SessionSummary:
+        user_input = json.loads(row["user_input"])
+        return SessionSummary(
+            session_id=row["session_id"],
+            created_at=datetime.fromisoformat(row["created_at"]),
+            name=user_input.get("name"),
+            script_type=user_input["script_type"],
+            tone=user_input.get("tone"),
+            voice_preference=user_input["voice_preference"],
+            audio_url=row["audio_url"],
+            duration_estimate=row["duration_estimate"],
+            audio_duration=row["audio_duration"]
+        )
+
+    def _audio_duration(self, audio_url: str) -> Optional[float]:
+        # Audio URLs point into the static mount, e.g. /static/audio/<file>.mp3
+        filepath = audio_url.lstrip("/")
+        if not filepath.endswith(".mp3") or not os.path.exists(filepath):
+            return None
+        return mp3_file_duration(filepath)
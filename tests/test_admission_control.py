@@ -0,0 +1,237 @@
+import asyncio
+
+import pytest
+
+from admission_control import AdmissionController, AdmissionRejected
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_requests_beyond_limit_and_queue_are_rejected():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5)
+        release = asyncio.Event()
+
+        async def hold():
+            async with controller.admit():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.admit():
+                pass
+        assert rejected.value.reason == "queue full"
+        assert rejected.value.retry_after >= 1
+        assert controller.stats()["active"] == 1
+        assert controller.stats()["queued"] == 1
+
+        release.set()
+        await asyncio.gather(holder, queued)
+        assert controller.is_idle()
+        assert controller.admitted == 2
+        assert controller.rejected_queue_full == 1
+
+    run(scenario())
+
+
+def test_waiters_are_admitted_in_fifo_order():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=10, queue_timeout=5)
+        order = []
+
+        async def request(index):
+            async with controller.admit():
+                order.append(index)
+                await asyncio.sleep(0.01)
+
+        tasks = []
+        for index in range(5):
+            tasks.append(asyncio.create_task(request(index)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        assert order == [0, 1, 2, 3, 4]
+
+    run(scenario())
+
+
+def test_released_slot_is_not_taken_by_a_newcomer_ahead_of_waiters():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=10, queue_timeout=5)
+        order = []
+        release = asyncio.Event()
+
+        async def first():
+            async with controller.admit():
+                await release.wait()
+            order.append("released")
+
+        async def request(name):
+            async with controller.admit():
+                order.append(name)
+
+        holder = asyncio.create_task(first())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(request("waiter"))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.sleep(0)
+        # The slot was handed to the waiter on release, so the newcomer has to queue
+        newcomer = asyncio.create_task(request("newcomer"))
+        await asyncio.gather(holder, waiter, newcomer)
+        assert order.index("waiter") < order.index("newcomer")
+
+    run(scenario())
+
+
+def test_queue_timeout_rejects_and_leaves_no_waiter_behind():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=5, queue_timeout=0.05)
+        release = asyncio.Event()
+
+        async def hold():
+            async with controller.admit():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.admit():
+                pass
+        assert rejected.value.reason == "queue timeout"
+        assert controller.rejected_timeout == 1
+        assert controller.stats()["queued"] == 0
+
+        release.set()
+        await holder
+        assert controller.is_idle()
+
+    run(scenario())
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=5, queue_timeout=5)
+        release = asyncio.Event()
+
+        async def hold():
+            async with controller.admit():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert controller.stats()["queued"] == 0
+
+        release.set()
+        await holder
+        assert controller.is_idle()
+        # The slot is free again for the next request
+        async with controller.admit():
+            assert controller.stats()["active"] == 1
+
+    run(scenario())
+
+
+def test_waiter_cancelled_after_handover_does_not_leak_the_slot():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=5, queue_timeout=5)
+        await controller._acquire(controller.reserve())
+
+        async def request():
+            async with controller.admit():
+                pass
+
+        waiter = asyncio.create_task(request())
+        await asyncio.sleep(0)
+        # Hand the slot over and cancel before the waiter gets to run
+        controller._release(latency=0.1)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert controller.is_idle()
+
+    run(scenario())
+
+
+def test_aimd_shrinks_on_slow_requests_and_grows_when_saturated():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=10, target_latency=1.0, min_limit=2, max_limit=12)
+        for _ in range(3):
+            controller._active += 1
+            controller._release(latency=5.0)
+        assert controller.limit == int(10 * 0.9 ** 3)
+
+        for _ in range(100):
+            controller._active += 1
+            controller._release(latency=5.0)
+        assert controller.limit == 2
+
+        # Fast requests only grow the limit while every slot is in use
+        controller._active = 1
+        controller._release(latency=0.1)
+        assert controller.limit == 2
+        for _ in range(200):
+            controller._active = controller.limit + 1
+            controller._release(latency=0.1)
+        assert controller.limit == 12
+
+    run(scenario())
+
+
+def test_retry_after_scales_with_queue_and_latency():
+    controller = AdmissionController(max_concurrent=2, max_queue=10, queue_timeout=30)
+    assert controller._retry_after() == 15
+    controller._avg_latency = 4.0
+    assert controller._retry_after() == 2
+
+
+def test_reservations_take_their_queue_place_immediately():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5)
+        first = controller.reserve()
+        second = controller.reserve()
+        assert first.waiter is None
+        assert controller.stats()["active"] == 1
+        assert controller.stats()["queued"] == 1
+        assert not controller.is_idle()
+        # Counted before either job has started, so a third request is shed up front
+        with pytest.raises(AdmissionRejected):
+            controller.reserve()
+        assert controller.rejected_queue_full == 1
+
+        order = []
+
+        async def job(name, reservation):
+            async with controller.admit(reservation):
+                order.append(name)
+
+        second_job = asyncio.create_task(job("second", second))
+        await asyncio.sleep(0)
+        await job("first", first)
+        await second_job
+        assert order == ["first", "second"]
+        assert controller.is_idle()
+
+    run(scenario())
+
+
+def test_queued_reservation_times_out_in_the_job():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=0.05)
+        controller.reserve()
+        queued = controller.reserve()
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.admit(queued):
+                pass
+        assert rejected.value.reason == "queue timeout"
+        assert controller.stats()["queued"] == 0
+
+    run(scenario())
@@ -0,0 +1,86 @@
+import pytest
+
+from audio_silence import (
+    DEFAULT_MP3_FORMAT, MAX_PAUSE_SECONDS, Mp3Format, detect_mp3_format, mp3_duration, mp3_file_duration, silent_mp3,
+    split_pauses
+)
+
+
+def frames(audio):
+    """Split a stream produced by silent_mp3 into frames using each header's padding bit"""
+    result = []
+    offset = 0
+    while offset < len(audio):
+        header = int.from_bytes(audio[offset:offset + 4], "big")
+        assert header >> 21 == 0x7FF
+        padding = (header >> 9) & 1
+        size = 417 + padding  # 44.1 kHz / 128 kbps
+        result.append(audio[offset:offset + size])
+        offset += size
+    assert offset == len(audio)
+    return result
+
+
+def test_split_pauses_attaches_pause_to_preceding_text():
+    assert split_pauses('Relax. <break time="1.5s" /> Breathe. [pause] Sleep.') == [
+        ("Relax.", 1.5), ("Breathe.", 1.5), ("Sleep.", 0.0)
+    ]
+
+
+def test_split_pauses_sums_consecutive_markers_and_parses_units():
+    assert split_pauses('Relax. <break time="500ms"/><break time=\'2s\' /> Now.') == [("Relax.", 2.5), ("Now.", 0.0)]
+
+
+def test_split_pauses_leading_pause_and_cap(capsys):
+    assert split_pauses('<break time="2s" /> Hello. <break time="30s" />') == [
+        ("", 2.0), ("Hello.", MAX_PAUSE_SECONDS)
+    ]
+    assert "30.0s pause shortened" in capsys.readouterr().out
+
+
+def test_split_pauses_without_markers():
+    assert split_pauses("  Just text.  ") == [("Just text.", 0.0)]
+    assert split_pauses("") == []
+
+
+@pytest.mark.parametrize("seconds", [0.5, 1.5, 2.0, 10.0])
+def test_silent_mp3_length_is_exact_to_one_frame(seconds):
+    audio = silent_mp3(seconds)
+    frame_seconds = 1152 / 44100
+    assert len(frames(audio)) == round(seconds / frame_seconds)
+    assert abs(mp3_duration(audio) - seconds) <= frame_seconds / 2 + 1e-3
+
+
+def test_silent_mp3_padding_keeps_exact_bitrate():
+    audio = silent_mp3(10.0)
+    frame_count = len(frames(audio))
+    # 144 * 128000 / 44100 = 417.959... bytes per frame on average
+    assert abs(len(audio) - frame_count * 144 * 128000 / 44100) < 1
+    assert all(byte == 0 for frame in frames(audio) for byte in frame[4:])
+
+
+def test_silent_mp3_round_trips_its_format():
+    mono_22k = Mp3Format(version=0b10, sample_rate=22050, bitrate_kbps=32, channel_mode=0b11)
+    assert detect_mp3_format(silent_mp3(1.0, mono_22k)) == mono_22k
+    assert detect_mp3_format(silent_mp3(1.0)) == DEFAULT_MP3_FORMAT
+
+
+def test_silent_mp3_too_short_is_empty():
+    assert silent_mp3(0.0) == b""
+    assert silent_mp3(0.01) == b""
+
+
+def test_detect_mp3_format_skips_id3_tag():
+    tag = b"ID3\x03\x00\x00\x00\x00\x00\x05" + b"\xff\xfb\x00\x00\x00"
+    assert detect_mp3_format(tag + silent_mp3(0.1)) == DEFAULT_MP3_FORMAT
+    assert detect_mp3_format(b"not an mp3") is None
+
+
+def test_mp3_duration_excludes_id3_tag(tmp_path):
+    tag = b"ID3\x03\x00\x00\x00\x00\x10\x00" + bytes(0x800)
+    audio = tag + silent_mp3(2.0)
+    assert mp3_duration(audio) == mp3_duration(silent_mp3(2.0))
+
+    path = tmp_path / "session.mp3"
+    path.write_bytes(audio)
+    assert mp3_file_duration(str(path)) == mp3_duration(audio)
@@ -0,0 +1,98 @@
+import os
+import threading
+
+import pytest
+
+from audio_variants import VARIANT_SPECS, AudioVariantTranscoder
+
+
+class FakeTranscoder(AudioVariantTranscoder):
+    """Transcoder whose ffmpeg runs are recorded instead of executed"""
+
+    def __init__(self, fail=(), block=None, **kwargs):
+        super().__init__(**kwargs)
+        self.enabled = True
+        self.fail = set(fail)
+        self.block = block
+        self.outputs = []
+
+    def _run_ffmpeg(self, source, args, output):
+        if self.block is not None:
+            self.block.wait()
+        self.outputs.append(output)
+        if any(suffix in output for suffix in self.fail):
+            with open(output, "wb") as f:
+                f.write(b"partial")
+            raise Exception("encoder missing")
+        with open(output, "wb") as f:
+            f.write(b"audio")
+
+
+@pytest.fixture
+def audio_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("static/audio")
+    for name in ("a", "b", "c"):
+        with open(f"static/audio/{name}.mp3", "wb") as f:
+            f.write(b"mp3")
+    return tmp_path
+
+
+def wait(transcoder):
+    transcoder._executor.shutdown(wait=True)
+
+
+def test_variants_are_written_to_temp_paths_and_moved_into_place(audio_dir):
+    transcoder = FakeTranscoder()
+    variants = transcoder.submit("/static/audio/a.mp3")
+    assert [v.name for v in variants] == [spec.name for spec in VARIANT_SPECS]
+    wait(transcoder)
+
+    assert all(".tmp" in output for output in transcoder.outputs)
+    assert all(v.ready for v in transcoder.variants("/static/audio/a.mp3"))
+    assert os.path.exists("static/audio/a.opus.ogg")
+    assert os.path.exists("static/audio/a_hls/index.m3u8")
+    assert not any(name.endswith(".tmp") for name in os.listdir("static/audio"))
+
+
+def test_failed_variant_leaves_no_file_and_is_not_retried(audio_dir):
+    transcoder = FakeTranscoder(fail={".opus.ogg"})
+    transcoder.submit("/static/audio/a.mp3")
+    wait(transcoder)
+
+    assert not os.path.exists("static/audio/a.opus.ogg")
+    assert not os.path.exists("static/audio/a.opus.ogg.tmp")
+    assert [v.name for v in transcoder.variants("/static/audio/a.mp3")] == ["mp3_low", "hls"]
+
+    runs = len(transcoder.outputs)
+    transcoder._executor = type(transcoder._executor)(max_workers=1)
+    transcoder.submit("/static/audio/a.mp3")
+    wait(transcoder)
+    assert len(transcoder.outputs) == runs
+
+
+def test_submissions_beyond_max_pending_are_skipped(audio_dir):
+    release = threading.Event()
+    transcoder = FakeTranscoder(block=release, max_workers=1, max_pending=2)
+    assert transcoder.submit("/static/audio/a.mp3")
+    assert transcoder.submit("/static/audio/b.mp3")
+    assert transcoder.submit("/static/audio/c.mp3") == []
+    # Resubmitting a pending session doesn't queue it twice
+    assert transcoder.submit("/static/audio/a.mp3")
+    release.set()
+    wait(transcoder)
+    assert transcoder._pending == set()
+
+
+def test_non_mp3_and_missing_files_are_not_transcoded(audio_dir):
+    transcoder = FakeTranscoder()
+    assert transcoder.submit("/static/audio/script.txt") == []
+    assert transcoder.submit("/static/audio/missing.mp3") == []
+
+
+def test_disabled_without_ffmpeg(audio_dir, monkeypatch):
+    monkeypatch.setattr("audio_variants.shutil.which", lambda name: None)
+    monkeypatch.setattr("audio_variants.imageio_ffmpeg", None)
+    transcoder = AudioVariantTranscoder()
+    assert not transcoder.enabled
+    assert transcoder.submit("/static/audio/a.mp3") == []
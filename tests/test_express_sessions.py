@@ -0,0 +1,184 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from admission_control import AdmissionRejected
+from audio_silence import silent_mp3
+from express_sessions import ExpressSessionManager
+from models import HypnosisResponse, ScriptType, Tone, UserInput, VoicePreference
+
+
+class FakeSynthesizer:
+    use_elevenlabs = True
+    voice_mappings = {VoicePreference.POETRY_LITERARY: {Tone.CALMED: "rachel", Tone.SPIRITUAL: "bella"}}
+
+    def __init__(self):
+        self.synthesized = []
+
+    async def synthesize_audio(self, script, tone, voice_type):
+        self.synthesized.append((tone, voice_type))
+        await asyncio.sleep(0.01)
+        return silent_mp3(2.0)
+
+    def save_audio(self, audio, filename=None):
+        with open(f"static/audio/{filename}", "wb") as f:
+            f.write(audio)
+        return f"/static/audio/{filename}"
+
+
+def response(script="Relax."):
+    return HypnosisResponse(script=script, audio_url="/static/audio/s.mp3", duration_estimate=1.0,
+                            script_type=ScriptType.TEST)
+
+
+async def generate(user_input):
+    return response(f"express={user_input.express}")
+
+
+async def settle(manager, job_id):
+    while manager.status(job_id).status == "pending":
+        await asyncio.sleep(0)
+    return manager.status(job_id)
+
+
+@pytest.fixture
+def audio_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "static" / "audio").mkdir(parents=True)
+    return tmp_path / "static" / "audio"
+
+
+def test_opening_is_rendered_once_and_cached(audio_dir):
+    async def scenario():
+        synthesizer = FakeSynthesizer()
+        manager = ExpressSessionManager(synthesizer, generate)
+        openings = await asyncio.gather(*(
+            manager.opening(Tone.CALMED, VoicePreference.POETRY_LITERARY) for _ in range(5)
+        ))
+        assert len(synthesizer.synthesized) == 1
+        assert len({opening.audio_url for opening in openings}) == 1
+        assert openings[0].duration == pytest.approx(2.0, abs=0.03)
+        assert "[pause]" not in openings[0].script
+
+        # A restarted server reuses the file instead of synthesizing again
+        restarted = FakeSynthesizer()
+        opening = await ExpressSessionManager(restarted, generate).opening(Tone.CALMED, VoicePreference.POETRY_LITERARY)
+        assert restarted.synthesized == []
+        assert opening.audio_url == openings[0].audio_url
+
+    asyncio.run(scenario())
+
+
+def test_editing_the_opening_text_renders_a_new_file(audio_dir, monkeypatch):
+    async def render():
+        manager = ExpressSessionManager(FakeSynthesizer(), generate)
+        return (await manager.opening(Tone.CALMED, VoicePreference.POETRY_LITERARY)).audio_url
+
+    original = asyncio.run(render())
+    monkeypatch.setattr("express_sessions.EXPRESS_OPENING", "A different opening. [pause]")
+    edited = asyncio.run(render())
+    assert edited != original
+    assert len(os.listdir(audio_dir)) == 2
+
+
+def test_no_opening_without_elevenlabs(audio_dir):
+    synthesizer = FakeSynthesizer()
+    synthesizer.use_elevenlabs = False
+    manager = ExpressSessionManager(synthesizer, generate)
+    assert asyncio.run(manager.opening(Tone.CALMED, VoicePreference.POETRY_LITERARY)) is None
+
+
+def test_warm_renders_every_voice(audio_dir):
+    synthesizer = FakeSynthesizer()
+    asyncio.run(ExpressSessionManager(synthesizer, generate).warm())
+    assert len(synthesizer.synthesized) == 2
+
+
+def test_job_generates_the_express_remainder():
+    async def scenario():
+        manager = ExpressSessionManager(FakeSynthesizer(), generate)
+        job_id = manager.start(UserInput())
+        assert manager.status(job_id).status == "pending"
+        return await settle(manager, job_id)
+
+    status = asyncio.run(scenario())
+    assert status.status == "ready"
+    assert status.session.script == "express=True"
+
+
+def test_job_uses_a_per_job_generate():
+    async def scenario():
+        manager = ExpressSessionManager(FakeSynthesizer(), generate)
+
+        async def custom(user_input):
+            return response("custom")
+
+        return await settle(manager, manager.start(UserInput(), custom))
+
+    assert asyncio.run(scenario()).session.script == "custom"
+
+
+def test_shed_job_fails_fast_with_retry_after():
+    async def shed(user_input):
+        raise AdmissionRejected(7, "queue timeout")
+
+    async def scenario():
+        manager = ExpressSessionManager(FakeSynthesizer(), shed)
+        return await settle(manager, manager.start(UserInput()))
+
+    status = asyncio.run(scenario())
+    assert status.status == "failed"
+    assert status.retry_after == 7
+
+
+def test_failed_job_reports_http_detail():
+    class HTTPError(Exception):
+        detail = "Gemini unavailable"
+
+    async def broken(user_input):
+        raise HTTPError()
+
+    async def scenario():
+        manager = ExpressSessionManager(FakeSynthesizer(), broken)
+        return await settle(manager, manager.start(UserInput()))
+
+    status = asyncio.run(scenario())
+    assert (status.status, status.error, status.retry_after) == ("failed", "Gemini unavailable", None)
+
+
+def test_finished_registers_a_ready_job():
+    manager = ExpressSessionManager(FakeSynthesizer(), generate)
+    job_id = manager.finished(response("pregenerated"))
+    status = manager.status(job_id)
+    assert (status.job_id, status.status, status.session.script) == (job_id, "ready", "pregenerated")
+    assert manager.status("unknown") is None
+
+
+def test_prune_drops_expired_and_excess_finished_jobs_but_not_running_ones():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def slow(user_input):
+            await release.wait()
+            return response()
+
+        manager = ExpressSessionManager(FakeSynthesizer(), slow, job_ttl_seconds=60, max_jobs=3)
+        running = manager.start(UserInput())
+        old = manager.finished(response())
+        manager._job_created[old] -= 120
+        manager._job_created[running] -= 120
+
+        fresh = [manager.finished(response()) for _ in range(2)]
+        assert manager.status(old) is None
+        assert manager.status(running) is not None
+
+        # At max_jobs, finished jobs make room even before they expire
+        manager.finished(response())
+        assert sum(manager.status(job_id) is not None for job_id in fresh) < 2
+        assert manager.status(running) is not None
+        release.set()
+        await settle(manager, running)
+
+    asyncio.run(scenario())
@@ -0,0 +1,172 @@
+import asyncio
+from collections import deque
+import os
+import time
+
+import pytest
+
+from models import BeliefOrientation, Gender, ScriptType, SessionSection, Tone, UserInput
+from pregeneration import PregeneratedSession, PresetPool, preset_key
+from script_pipeline import GeneratedSession
+
+
+class FakePipeline:
+    def __init__(self, release=None):
+        self.calls = []
+        self.release = release
+
+    async def generate(self, user_input):
+        self.calls.append(user_input)
+        if self.release is not None:
+            await self.release.wait()
+        return GeneratedSession("Relax.", f"/static/audio/pre_{len(self.calls)}.mp3", [])
+
+
+def make_pool(pipeline=None, is_idle=lambda: True, **kwargs):
+    options = dict(enabled=True, top_k=2, sessions_per_preset=2, ttl_seconds=60, max_per_hour=3, max_per_day=5)
+    options.update(kwargs)
+    return PresetPool(pipeline or FakePipeline(), is_idle, **options)
+
+
+def pooled(audio_dir, name, age_seconds=0.0):
+    audio = audio_dir / f"{name}.mp3"
+    section = audio_dir / f"{name}_induction.mp3"
+    audio.write_bytes(b"mp3")
+    section.write_bytes(b"mp3")
+    return PregeneratedSession(
+        "Relax.", f"/static/audio/{name}.mp3",
+        [SessionSection(name="induction", script="Relax.", audio_url=f"/static/audio/{name}_induction.mp3")],
+        time.time() - age_seconds
+    )
+
+
+@pytest.fixture
+def audio_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "static" / "audio").mkdir(parents=True)
+    return tmp_path / "static" / "audio"
+
+
+@pytest.mark.parametrize("fields", [
+    {"name": "Ann"},
+    {"age": 30},
+    {"gender": Gender.FEMALE},
+    {"personality": "anxious"},
+    {"custom_goal": "sleep better"},
+    {"belief_orientation": BeliefOrientation.SPIRITUAL},
+    {"express": True},
+])
+def test_personal_or_express_requests_have_no_preset(fields):
+    assert preset_key(UserInput(**fields)) is None
+
+
+def test_generic_requests_are_grouped_by_susceptibility_level():
+    assert preset_key(UserInput(name="Guest", custom_goal="  ", belief_orientation=BeliefOrientation.NEUTRAL))
+    assert preset_key(UserInput(predisposition_score=66)) == preset_key(UserInput(predisposition_score=95))
+    assert preset_key(UserInput(predisposition_score=66)) != preset_key(UserInput(predisposition_score=50))
+    assert preset_key(UserInput(tone=None)).tone == Tone.CALMED
+
+
+def test_take_serves_fresh_sessions_and_counts_hit_rate(audio_dir):
+    pool = make_pool()
+    key = preset_key(UserInput())
+    session = pooled(audio_dir, "fresh")
+    pool._pool[key] = deque([session])
+
+    assert pool.take(UserInput()) == session
+    assert pool.take(UserInput()) is None
+    assert pool.take(UserInput(name="Ann")) is None  # not counted at all
+    stats = pool.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+    assert stats["top_presets"][0][1] == 2
+    assert (audio_dir / "fresh.mp3").exists()
+
+
+def test_take_discards_expired_sessions_and_their_files(audio_dir):
+    pool = make_pool()
+    key = preset_key(UserInput())
+    pool._pool[key] = deque([pooled(audio_dir, "old", age_seconds=120)])
+
+    assert pool.take(UserInput()) is None
+    assert pool.expired == 1
+    assert os.listdir(audio_dir) == []
+
+
+def test_next_preset_picks_top_k_presets_whose_pool_is_not_full(audio_dir):
+    pool = make_pool(top_k=2)
+    popular = UserInput(script_type=ScriptType.FLIGHT)
+    second = UserInput(script_type=ScriptType.NEXT)
+    for _ in range(3):
+        pool.take(popular)
+    for _ in range(2):
+        pool.take(second)
+    pool.take(UserInput(script_type=ScriptType.LOW))
+
+    assert pool._next_preset() == preset_key(popular)
+    pool._pool[preset_key(popular)].extend([pooled(audio_dir, "a"), pooled(audio_dir, "b")])
+    assert pool._next_preset() == preset_key(second)
+    pool._pool[preset_key(second)].extend([pooled(audio_dir, "c"), pooled(audio_dir, "d")])
+    assert pool._next_preset() is None  # the third preset is outside the top 2
+
+    # Expired sessions free their slot and are deleted
+    pool._pool[preset_key(popular)][0] = pooled(audio_dir, "a", age_seconds=120)
+    assert pool._next_preset() == preset_key(popular)
+    assert not (audio_dir / "a.mp3").exists()
+
+
+def test_budget_enforces_hourly_and_daily_caps():
+    pool = make_pool(max_per_hour=3, max_per_day=5)
+    now = time.time()
+    assert pool._within_budget()
+
+    pool._spend.extend([now - 30, now - 20, now - 10])
+    assert not pool._within_budget()
+
+    pool._spend.clear()
+    pool._spend.extend([now - 7200] * 3 + [now - 10])
+    assert pool._within_budget()
+    pool._spend.append(now - 5)
+    assert not pool._within_budget()
+
+    # Entries older than a day no longer count
+    pool._spend.clear()
+    pool._spend.extend([now - 90000] * 10)
+    assert pool._within_budget()
+    assert len(pool._spend) == 0
+
+
+def test_pregeneration_fills_the_pool():
+    pipeline = FakePipeline()
+    pool = make_pool(pipeline)
+    key = preset_key(UserInput(predisposition_score=90))
+    asyncio.run(pool._pregenerate_while_idle(key))
+    assert pipeline.calls[0].predisposition_score == 75.0
+    assert len(pool._pool[key]) == 1
+    assert pool.generated == 1
+
+
+def test_pregeneration_is_cancelled_when_user_traffic_arrives():
+    async def scenario():
+        idle = True
+        pipeline = FakePipeline(release=asyncio.Event())
+        pool = make_pool(pipeline, is_idle=lambda: idle, idle_check_interval=0.01)
+        key = preset_key(UserInput())
+        run = asyncio.create_task(pool._pregenerate_while_idle(key))
+        await asyncio.sleep(0.05)
+        assert not run.done()
+
+        idle = False
+        await asyncio.wait_for(run, timeout=1)
+        return pool, key
+
+    pool, key = asyncio.run(scenario())
+    assert pool.cancelled == 1
+    assert pool.generated == 0
+    assert not pool._pool.get(key)
+
+
+def test_stop_deletes_pooled_sessions(audio_dir):
+    pool = make_pool()
+    pool._pool[preset_key(UserInput())] = deque([pooled(audio_dir, "kept")])
+    asyncio.run(pool.stop())
+    assert os.listdir(audio_dir) == []
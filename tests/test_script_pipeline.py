@@ -0,0 +1,179 @@
+import asyncio
+import threading
+
+import pytest
+
+from models import UserInput
+from script_pipeline import ScriptPipeline
+from voice_synthesizer_simple import VoiceSynthesizerSimple
+
+SENTENCES = [f"Sentence number {i} is here. " for i in range(40)]
+
+
+class FakeGenerator:
+    """Streams a fixed script and records how much of it was consumed"""
+
+    def __init__(self, chunks=SENTENCES):
+        self.chunks = chunks
+        self.consumed = 0
+        self.closed = False
+        self.sequential_calls = 0
+
+    def stream_script(self, user_input):
+        try:
+            for chunk in self.chunks:
+                self.consumed += 1
+                yield chunk
+        finally:
+            self.closed = True
+
+    def generate_script(self, user_input):
+        self.sequential_calls += 1
+        self.thread = threading.current_thread()
+        return "[[induction]] Relax."
+
+
+class FakeSynthesizer(VoiceSynthesizerSimple):
+    """Real pipelining logic with synthesis and storage replaced by in-memory stubs"""
+
+    def __init__(self, synthesize=None):
+        super().__init__(api_key=None)
+        self.use_elevenlabs = True
+        self.api_key = "key"
+        self.saved = []
+        self.fallback_calls = 0
+        self._synthesize = synthesize
+
+    async def _synthesize_with_pauses(self, script, voice_id, previous_text=None):
+        if self._synthesize is not None:
+            return await self._synthesize(script)
+        return script.encode()
+
+    def save_audio(self, audio, filename=None):
+        self.saved.append(audio)
+        return f"/static/audio/{len(self.saved)}.mp3"
+
+    async def generate_voice(self, script, tone, voice_type):
+        self.fallback_calls += 1
+        return "/static/audio/sequential.mp3"
+
+
+def pipeline(generator, synthesizer, **kwargs):
+    return ScriptPipeline(generator, synthesizer, min_segment_chars=1, **kwargs)
+
+
+def test_audio_is_joined_in_script_order_despite_out_of_order_synthesis():
+    async def synthesize(text):
+        # Earlier segments take longer, so they finish after later ones
+        number = int(text.split()[2])
+        await asyncio.sleep(0.002 * (2 - number % 3))
+        return text.encode()
+
+    generator = FakeGenerator()
+    synthesizer = FakeSynthesizer(synthesize)
+    session = asyncio.run(pipeline(generator, synthesizer).generate(UserInput()))
+
+    full_audio = synthesizer.saved[-1]
+    assert full_audio == "".join(sentence.strip() for sentence in SENTENCES).encode()
+    assert session.script == "".join(SENTENCES).strip()
+    assert generator.closed
+
+
+def test_gemini_stream_is_throttled_while_synthesis_is_blocked():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def synthesize(text):
+            await release.wait()
+            return text.encode()
+
+        generator = FakeGenerator()
+        task = asyncio.create_task(
+            pipeline(generator, FakeSynthesizer(synthesize), max_queued_segments=2).generate(UserInput())
+        )
+        await asyncio.sleep(0.5)
+        # 3 in flight, 1 awaiting a TTS slot, 2 queued, 1 blocked in put() and 1 being segmented
+        consumed_while_blocked = generator.consumed
+        release.set()
+        await task
+        return consumed_while_blocked
+
+    assert asyncio.run(scenario()) <= 8
+
+
+def test_tts_failure_closes_the_gemini_stream_and_falls_back():
+    async def synthesize(text):
+        if "number 2 " in text:
+            raise RuntimeError("ElevenLabs down")
+        await asyncio.sleep(0.01)
+        return text.encode()
+
+    generator = FakeGenerator()
+    synthesizer = FakeSynthesizer(synthesize)
+    session = asyncio.run(pipeline(generator, synthesizer, max_queued_segments=2).generate(UserInput()))
+
+    assert generator.closed
+    assert generator.consumed < len(SENTENCES)
+    assert generator.sequential_calls == 1
+    assert synthesizer.fallback_calls == 1
+    assert session.audio_url == "/static/audio/sequential.mp3"
+
+
+def test_stream_failure_falls_back_to_sequential_generation():
+    class FailingGenerator(FakeGenerator):
+        def stream_script(self, user_input):
+            yield SENTENCES[0]
+            raise RuntimeError("stream dropped")
+
+    generator = FailingGenerator()
+    synthesizer = FakeSynthesizer()
+    session = asyncio.run(pipeline(generator, synthesizer).generate(UserInput()))
+    assert generator.sequential_calls == 1
+    assert session.script == "Relax."
+
+
+def test_sequential_generation_runs_gemini_off_the_event_loop():
+    generator = FakeGenerator()
+    synthesizer = FakeSynthesizer()
+    synthesizer.use_elevenlabs = False
+    session = asyncio.run(ScriptPipeline(generator, synthesizer).generate(UserInput()))
+    assert session.script == "Relax."
+    assert generator.thread is not threading.main_thread()
+
+
+def test_sections_keep_their_own_audio():
+    generator = FakeGenerator(["[[induction]]\nRelax now. ", "[[deepening]]\nGo deeper. ", "Deeper still."])
+    synthesizer = FakeSynthesizer()
+    session = asyncio.run(pipeline(generator, synthesizer).generate(UserInput()))
+    assert [section.name for section in session.sections] == ["induction", "deepening"]
+    assert session.sections[1].script == "Go deeper. Deeper still."
+    assert synthesizer.saved[:2] == [b"Relax now.", b"Go deeper.Deeper still."]
+
+
+@pytest.mark.parametrize("max_in_flight", [1, 3])
+def test_synthesize_pipelined_limits_in_flight_segments(max_in_flight):
+    async def scenario():
+        running = 0
+        peak = 0
+
+        async def synthesize(text):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.005)
+            running -= 1
+            return text.encode()
+
+        async def segments():
+            for i in range(10):
+                yield f"Part {i}."
+
+        synthesizer = FakeSynthesizer(synthesize)
+        audio = await synthesizer.synthesize_pipelined(
+            segments(), UserInput().tone, UserInput().voice_preference, max_in_flight=max_in_flight
+        )
+        return audio, peak
+
+    audio, peak = asyncio.run(scenario())
+    assert audio == [f"Part {i}.".encode() for i in range(10)]
+    assert peak == max_in_flight
@@ -0,0 +1,76 @@
+import pytest
+
+from script_pipeline import ScriptSegmenter, ScriptSegment
+
+SCRIPT = (
+    "[[induction]]\n"
+    "Welcome. Settle into a comfortable position and let your eyes close. <break time=\"1.5s\" />\n"
+    "Breathe in slowly. Breathe out slowly! Notice the weight of your body? [pause]\n"
+    "[[deepening]]\n"
+    "With every breath you drift a little deeper. Deeper and deeper. <break time=\"2s\" />\n"
+    "[[suggestion]]\n"
+    "You feel calm and confident (more and more). Each day is easier.\n"
+    "[[emergence]]\n"
+    "Now slowly return, feeling refreshed. Open your eyes."
+)
+
+
+def segment(chunks, min_chars=40):
+    segmenter = ScriptSegmenter(min_chars=min_chars)
+    segments = []
+    for chunk in chunks:
+        segments.extend(segmenter.feed(chunk))
+    return segments + segmenter.flush()
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 13, 50, len(SCRIPT)])
+def test_segments_do_not_depend_on_chunk_boundaries(size):
+    assert segment(chunked(SCRIPT, size)) == segment([SCRIPT])
+
+
+def test_pause_markers_close_segments_and_stay_at_their_end():
+    segments = segment([SCRIPT], min_chars=10_000)
+    assert segments[0] == ScriptSegment(
+        "Welcome. Settle into a comfortable position and let your eyes close. <break time=\"1.5s\" />",
+        "induction"
+    )
+    assert segments[1].text.endswith("[pause]")
+
+
+def test_section_markers_are_dropped_and_tag_segments():
+    segments = segment([SCRIPT])
+    assert all("[[" not in s.text for s in segments)
+    assert [s.section for s in segments] == sorted(
+        (s.section for s in segments), key=["induction", "deepening", "suggestion", "emergence"].index
+    )
+    assert {s.section for s in segments} == {"induction", "deepening", "suggestion", "emergence"}
+
+
+def test_segments_cover_all_spoken_text():
+    joined = " ".join(s.text for s in segment(chunked(SCRIPT, 5)))
+    expected = SCRIPT
+    for marker in ("[[induction]]", "[[deepening]]", "[[suggestion]]", "[[emergence]]"):
+        expected = expected.replace(marker, "")
+    assert joined.split() == expected.split()
+
+
+def test_short_sentences_are_merged_up_to_min_chars():
+    segments = segment(["One. Two. Three. Four. Five. Six. "], min_chars=12)
+    assert [s.text for s in segments] == ["One. Two. Three.", "Four. Five. Six."]
+
+
+def test_sentence_end_waits_for_following_whitespace():
+    segmenter = ScriptSegmenter(min_chars=1)
+    # "3." could be the start of "3.5", so nothing closes until the space arrives
+    assert segmenter.feed("Count to 3.") == []
+    assert segmenter.feed("5 now. ") == [ScriptSegment("Count to 3.5 now.", "script")]
+
+
+def test_text_before_first_marker_is_tagged_script():
+    segments = segment(["Hello there. [[induction]] Relax now."], min_chars=1)
+    assert segments == [ScriptSegment("Hello there.", "script"), ScriptSegment("Relax now.", "induction")]
+
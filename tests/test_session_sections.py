@@ -0,0 +1,59 @@
+import asyncio
+from datetime import datetime, timezone
+
+from models import SessionRecord, SessionSection, UserInput
+from script_pipeline import ScriptPipeline
+from session_sections import affected_sections, susceptibility_level
+
+
+def test_score_changes_within_a_level_affect_nothing():
+    previous = UserInput(predisposition_score=72)
+    assert affected_sections(previous, UserInput(predisposition_score=73)) == set()
+    assert affected_sections(previous, UserInput(predisposition_score=50)) == {"induction", "deepening"}
+
+
+def test_field_changes_map_to_their_sections():
+    previous = UserInput(name="Ana")
+    assert affected_sections(previous, UserInput(name="Ana")) == set()
+    texts = {name: "No names here." for name in ("induction", "deepening", "suggestion", "emergence")}
+    assert affected_sections(previous, UserInput(name="Bo"), texts) == {"induction", "emergence"}
+    assert affected_sections(previous, UserInput(name="Ana", custom_goal="sleep")) == {"suggestion"}
+
+
+def test_name_change_redoes_every_section_that_mentions_the_old_name():
+    texts = {
+        "induction": "Welcome, Ann.",
+        "deepening": "Deeper now, ann, deeper.",
+        "suggestion": "Annual habits fade.",
+        "emergence": "Wake up.",
+    }
+    assert affected_sections(UserInput(name="Ann"), UserInput(name="Bob"), texts) == {
+        "induction", "deepening", "emergence"
+    }
+    # Without the texts every section has to be assumed to use the name
+    assert len(affected_sections(UserInput(name="Ann"), UserInput(name="Bob"))) == 4
+    assert affected_sections(UserInput(name=None), UserInput(name="Guest"), texts) == set()
+
+
+def test_susceptibility_levels():
+    assert [susceptibility_level(score) for score in (None, 0, 30, 45, 64, 65, 100)] == [
+        "Medium", "Medium", "Low", "Medium", "Medium", "High", "High"
+    ]
+
+
+def test_unchanged_request_reuses_previous_session():
+    previous = SessionRecord(
+        session_id="abc",
+        created_at=datetime.now(timezone.utc),
+        script_type=UserInput().script_type,
+        voice_preference=UserInput().voice_preference,
+        audio_url="/static/audio/previous.mp3",
+        duration_estimate=1.0,
+        script="Relax.",
+        user_input=UserInput(predisposition_score=72),
+        sections=[SessionSection(name="induction", script="Relax.", audio_url="/static/audio/induction.mp3")]
+    )
+    pipeline = ScriptPipeline(script_generator=None, voice_synthesizer=None)
+    session = asyncio.run(pipeline.regenerate(UserInput(predisposition_score=73), previous))
+    assert session.audio_url == previous.audio_url
+    assert session.regenerated_sections == []
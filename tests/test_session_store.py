@@ -0,0 +1,98 @@
+import sqlite3
+import time
+
+import pytest
+
+from audio_silence import silent_mp3
+from models import ScriptType, SessionSection, UserInput
+from session_store import SessionStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SessionStore(str(tmp_path / "data" / "sessions.db"))
+
+
+def save(store, user_id="alice", script_type=ScriptType.TEST, audio_url="/static/audio/missing.mp3", **fields):
+    session_id = store.save(UserInput(user_id=user_id, script_type=script_type, **fields), "Relax.", audio_url, 12.0)
+    time.sleep(0.001)  # keeps created_at strictly increasing
+    return session_id
+
+
+def test_save_and_get_round_trip(store):
+    sections = [SessionSection(name="induction", script="Relax.", audio_url="/static/audio/a.mp3")]
+    user_input = UserInput(user_id="alice", name="Ann", age=40, personality="anxious", custom_goal="sleep")
+    session_id = store.save(user_input, "Relax.", "/static/audio/missing.mp3", 12.0, sections)
+
+    session = store.get(session_id)
+    assert session.session_id == session_id
+    assert session.user_input == user_input
+    assert session.script == "Relax."
+    assert session.sections == sections
+    assert session.name == "Ann"
+    assert session.audio_duration is None
+    assert store.get("unknown") is None
+
+
+def test_audio_duration_is_read_from_the_file(store, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "static" / "audio").mkdir(parents=True)
+    (tmp_path / "static" / "audio" / "s.mp3").write_bytes(silent_mp3(3.0))
+    session = store.get(save(store, audio_url="/static/audio/s.mp3"))
+    assert session.audio_duration == pytest.approx(3.0, abs=0.03)
+
+
+def test_list_pages_newest_first_with_total(store):
+    ids = [save(store) for _ in range(5)]
+    save(store, user_id="bob")
+
+    page, total = store.list("alice", limit=2, offset=0)
+    assert total == 5
+    assert [s.session_id for s in page] == ids[::-1][:2]
+    page, _ = store.list("alice", limit=2, offset=4)
+    assert [s.session_id for s in page] == [ids[0]]
+
+
+def test_list_filters_by_user_and_script_type(store):
+    save(store, script_type=ScriptType.TEST)
+    flight_id = save(store, script_type=ScriptType.FLIGHT)
+    save(store, user_id="bob", script_type=ScriptType.FLIGHT)
+
+    page, total = store.list("alice", script_type=ScriptType.FLIGHT)
+    assert total == 1
+    assert page[0].session_id == flight_id
+    assert store.list("carol") == ([], 0)
+
+
+def test_get_owned_only_returns_the_creators_session(store):
+    session_id = save(store, user_id="alice")
+    anonymous_id = save(store, user_id=None)
+
+    assert store.get_owned(session_id, "alice").session_id == session_id
+    assert store.get_owned(session_id, "bob") is None
+    assert store.get_owned(session_id, None) is None
+    assert store.get_owned(session_id, "") is None
+    assert store.get_owned(anonymous_id, None) is None
+    assert store.get_owned("unknown", "alice") is None
+
+
+def test_databases_without_sections_column_are_migrated(tmp_path):
+    db_path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE sessions (session_id TEXT PRIMARY KEY, user_id TEXT, created_at TEXT NOT NULL,"
+        " script_type TEXT NOT NULL, user_input TEXT NOT NULL, script TEXT NOT NULL, audio_url TEXT NOT NULL,"
+        " duration_estimate REAL NOT NULL, audio_duration REAL)"
+    )
+    conn.execute(
+        "INSERT INTO sessions VALUES ('old', 'alice', '2025-01-01T00:00:00+00:00', 'test', ?, 'Relax.',"
+        " '/static/audio/old.mp3', 12.0, NULL)",
+        (UserInput(user_id="alice").model_dump_json(),)
+    )
+    conn.commit()
+    conn.close()
+
+    store = SessionStore(db_path)
+    assert store.get("old").sections == []
+    new_id = save(store)
+    assert [s.session_id for s in store.list("alice")[0]] == [new_id, "old"]
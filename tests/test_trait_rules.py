@@ -0,0 +1,54 @@
+from trait_rules import PERSONALITY_RULES, TraitMatcher, TraitRule, score_band
+
+ANXIOUS, ENERGETIC, ANALYTICAL, CREATIVE = (rule.phrase for rule in PERSONALITY_RULES[:4])
+
+
+def test_matches_whole_words_only():
+    matcher = TraitMatcher(PERSONALITY_RULES)
+    assert matcher.match("I am active") == [ENERGETIC]
+    assert matcher.match("I am proactive") == []
+    assert matcher.match("inactive, retired") == []
+
+
+def test_every_matching_rule_in_table_order():
+    matcher = TraitMatcher(PERSONALITY_RULES)
+    assert matcher.match("Creative but anxious, quite analytical") == [ANXIOUS, ANALYTICAL, CREATIVE]
+
+
+def test_case_and_punctuation_are_ignored():
+    matcher = TraitMatcher(PERSONALITY_RULES)
+    assert matcher.match("ANXIOUS!") == [ANXIOUS]
+    assert matcher.match("(nervous),stressed") == [ANXIOUS]
+
+
+def test_rule_matched_once_even_with_several_keywords():
+    matcher = TraitMatcher(PERSONALITY_RULES)
+    assert matcher.match("nervous, worried and tense") == [ANXIOUS]
+
+
+def test_empty_and_none_input():
+    matcher = TraitMatcher(PERSONALITY_RULES)
+    assert matcher.match(None) == []
+    assert matcher.match("") == []
+
+
+def test_overlapping_keywords_use_failure_links():
+    matcher = TraitMatcher([
+        TraitRule(("she",), "she"),
+        TraitRule(("he",), "he"),
+        TraitRule(("hers",), "hers"),
+        TraitRule(("ushers",), "ushers"),
+    ])
+    assert matcher.match("ushers") == ["ushers"]
+    assert matcher.match("hers he") == ["he", "hers"]
+    assert matcher.match("ushe she") == ["she"]
+
+
+def test_multi_word_keywords():
+    matcher = TraitMatcher([TraitRule(("people pleaser",), "pleaser")])
+    assert matcher.match("a real people pleaser.") == ["pleaser"]
+    assert matcher.match("people pleasers") == []
+
+
+def test_score_band_edges():
+    assert [score_band(score) for score in (0, 44.9, 45, 64.9, 65, 79.9, 80, 100)] == [0, 0, 1, 1, 2, 2, 3, 3]
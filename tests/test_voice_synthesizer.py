@@ -0,0 +1,50 @@
+import asyncio
+import threading
+import time
+
+from models import Tone, VoicePreference
+from voice_synthesizer_simple import VoiceSynthesizerSimple
+
+
+class FakeResponse:
+    status_code = 200
+    content = b""
+
+
+def test_speech_requests_are_limited_to_max_concurrent(monkeypatch):
+    synthesizer = VoiceSynthesizerSimple(api_key=None)
+    synthesizer.use_elevenlabs = synthesizer.api_key = True
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    def request_speech(text, voice_id, previous_text=None):
+        with lock:
+            running.append(text)
+            peak.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.remove(text)
+        return FakeResponse()
+
+    monkeypatch.setattr(synthesizer, "_request_speech", request_speech)
+    script = " [pause] ".join(f"Sentence {i}." for i in range(12))
+
+    audio = asyncio.run(synthesizer.synthesize_audio(script, Tone.CALMED, VoicePreference.POETRY_LITERARY))
+    assert len(peak) == 12
+    assert max(peak) <= synthesizer.max_concurrent_requests
+    # The (empty) speech parts are still joined by the locally rendered pauses
+    assert len(audio) > 0
+
+
+def test_speech_request_has_timeout(monkeypatch):
+    synthesizer = VoiceSynthesizerSimple(api_key="key")
+    captured = {}
+
+    def post(url, **kwargs):
+        captured.update(kwargs)
+        return FakeResponse()
+
+    monkeypatch.setattr("voice_synthesizer_simple.requests.post", post)
+    synthesizer._request_speech("Hello.", "voice")
+    assert captured["timeout"] == synthesizer.request_timeout
@@ -0,0 +1,102 @@
+from bisect import bisect_right
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+class TraitRule(NamedTuple):
+    keywords: Tuple[str, ...]
+    phrase: str
+
+
+# Declarative personality lexicon: any keyword found as a whole word in the user's
+# personality text adds the rule's phrase, in table order. Extend freely; matching
+# cost depends on the length of the text, not on the size of this table.
+PERSONALITY_RULES = [
+    TraitRule(("anxious", "anxiety", "nervous", "worried", "worrier", "stressed", "tense"),
+              "Notice how your breathing naturally slows and deepens, washing away any tension or worry."),
+    TraitRule(("energetic", "active", "restless", "busy", "hyper"),
+              "Even your vibrant energy can find perfect balance in this peaceful state."),
+    TraitRule(("analytical", "logical", "skeptical", "sceptical", "rational"),
+              "Your thoughtful mind can simply observe, curious about what you notice next."),
+    TraitRule(("creative", "imaginative", "artistic", "dreamy", "visual"),
+              "Let your rich imagination paint each image vividly as we continue."),
+    TraitRule(("introvert", "introverted", "shy", "quiet", "reserved"),
+              "This quiet inner space belongs entirely to you, safe and unhurried."),
+    TraitRule(("perfectionist", "controlling", "driven", "ambitious"),
+              "Right now there is nothing to achieve, and that is exactly right."),
+    TraitRule(("tired", "exhausted", "insomnia", "sleepless"),
+              "Your body welcomes this deep rest, restoring energy with every breath."),
+]
+
+# Predisposition score bands: 0 = below 45, 1 = 45-64, 2 = 65-79, 3 = 80 and above
+SCORE_BAND_EDGES = (45, 65, 80)
+
+
+def score_band(score: float) -> int:
+    return bisect_right(SCORE_BAND_EDGES, score)
+
+
+class TraitMatcher:
+    """Aho-Corasick automaton over all rule keywords, built once.
+
+    ``match`` scans the text in a single pass regardless of how many keywords
+    there are and returns the phrase of every rule with a whole-word hit.
+    """
+
+    def __init__(self, rules: Iterable[TraitRule]):
+        self.rules = list(rules)
+        # Trie as parallel arrays: goto transitions, failure links, and outputs
+        # as (keyword length, rule index) pairs
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, int]]] = [[]]
+
+        for rule_index, rule in enumerate(self.rules):
+            for keyword in rule.keywords:
+                self._add(keyword.lower(), rule_index)
+        self._build_failure_links()
+
+    def match(self, text: Optional[str]) -> List[str]:
+        if not text:
+            return []
+
+        text = text.lower()
+        matched = set()
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, rule_index in self._output[state]:
+                if rule_index not in matched and self._is_whole_word(text, position - length + 1, position + 1):
+                    matched.add(rule_index)
+
+        return [self.rules[rule_index].phrase for rule_index in sorted(matched)]
+
+    def _add(self, keyword: str, rule_index: int):
+        state = 0
+        for char in keyword:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._output[state].append((len(keyword), rule_index))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                # Inherit matches that end here via the suffix link
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    @staticmethod
+    def _is_whole_word(text: str, start: int, end: int) -> bool:
+        return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
@@ -1,8 +1,10 @@
 import os
+import asyncio
 import requests
 from models import Tone, VoicePreference
+from audio_silence import DEFAULT_MP3_FORMAT, PAUSE_MARKER, detect_mp3_format, silent_mp3, split_pauses
 import uuid
-from typing import Optional
+from typing import AsyncIterator, List, Optional
 
 class VoiceSynthesizerSimple:
     """Voice synthesizer using direct ElevenLabs API calls"""
@@ -13,6 +15,12 @@ class VoiceSynthesizerSimple:
         self.use_elevenlabs = api_key is not None and self.enable_voice_generation
         self.base_url = "https://api.elevenlabs.io/v1"
         self.fallback_mp3_url = "https://file-examples.com/wp-content/storage/2017/11/file_example_MP3_700KB.mp3"
+        # Pauses are rendered locally, so speech must come back in a known MP3 format
+        self.output_format = "mp3_44100_128"
+        self.max_concurrent_requests = 3
+        # (connect, read) seconds, so a hung ElevenLabs call fails instead of holding a request slot
+        self.request_timeout = (10, float(os.getenv("ELEVENLABS_TIMEOUT", "60")))
+        self._request_slots: Optional[asyncio.Semaphore] = None
         
         if self.use_elevenlabs:
             print(f"ElevenLabs API initialized with key: {api_key[:10]}...")
@@ -45,44 +53,131 @@ class VoiceSynthesizerSimple:
         try:
             voice_id = self.voice_mappings[voice_type][tone]
             
-            # Direct API call to ElevenLabs
-            url = f"{self.base_url}/text-to-speech/{voice_id}"
-            
-            headers = {
-                "Accept": "audio/mpeg",
-                "Content-Type": "application/json",
-                "xi-api-key": self.api_key
-            }
-            
-            data = {
-                "text": script,
-                "model_id": "eleven_multilingual_v2",
-                "voice_settings": {
-                    "stability": 0.5,
-                    "similarity_boost": 0.75
-                }
-            }
-            
-            response = requests.post(url, json=data, headers=headers)
-            
-            if response.status_code == 200:
-                filename = f"hypnosis_{uuid.uuid4().hex}.mp3"
-                filepath = f"static/audio/{filename}"
-                
-                os.makedirs("static/audio", exist_ok=True)
-                
-                with open(filepath, 'wb') as f:
-                    f.write(response.content)
-                
-                return f"/static/audio/{filename}"
-            else:
-                print(f"ElevenLabs API error: {response.status_code} - {response.text}")
-                return await self._generate_fallback(script, tone, voice_type)
+            audio = await self._synthesize_with_pauses(script, voice_id)
+            return self.save_audio(audio)
             
         except Exception as e:
             print(f"ElevenLabs failed: {e}, using fallback")
             return await self._generate_fallback(script, tone, voice_type)
 
+    async def synthesize_pipelined(self, segments: AsyncIterator[str], tone: Tone,
+                                   voice_type: VoicePreference, max_in_flight: int = 3) -> List[bytes]:
+        """Synthesize script segments as they arrive and return their audio in arrival order.
+        
+        At most ``max_in_flight`` segments are synthesized at once; the segment source
+        is not read further until one of them finishes. If any segment fails, all
+        pending syntheses are cancelled and the error is raised.
+        """
+        if not (self.use_elevenlabs and self.api_key):
+            raise RuntimeError("Pipelined synthesis requires ElevenLabs")
+        
+        voice_id = self.voice_mappings[voice_type][tone]
+        slots = asyncio.Semaphore(max_in_flight)
+        tasks: List[asyncio.Task] = []
+        previous_text = None
+        
+        async def synthesize(text: str, previous: Optional[str]) -> bytes:
+            try:
+                return await self._synthesize_with_pauses(text, voice_id, previous)
+            finally:
+                slots.release()
+        
+        try:
+            async for segment in segments:
+                await slots.acquire()
+                # Fail fast instead of consuming more of the script after an error
+                for task in tasks:
+                    if task.done() and task.exception() is not None:
+                        slots.release()
+                        raise task.exception()
+                tasks.append(asyncio.create_task(synthesize(segment, previous_text)))
+                previous_text = PAUSE_MARKER.sub(" ", segment).strip() or previous_text
+            
+            return list(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    async def synthesize_audio(self, script: str, tone: Tone, voice_type: VoicePreference,
+                               previous_text: Optional[str] = None) -> bytes:
+        """Synthesize a script to MP3 bytes without saving it; errors are raised, not replaced by a fallback"""
+        if not (self.use_elevenlabs and self.api_key):
+            raise RuntimeError("Synthesis requires ElevenLabs")
+        return await self._synthesize_with_pauses(script, self.voice_mappings[voice_type][tone], previous_text)
+
+    async def _synthesize_with_pauses(self, script: str, voice_id: str, previous_text: Optional[str] = None) -> bytes:
+        """Synthesize the speech between pause markers and fill the pauses with local silence.
+        
+        Markers are never sent to ElevenLabs, so they cost no characters and are never
+        read aloud; each pause becomes silent frames in the same format as the speech.
+        """
+        parts = split_pauses(script)
+        
+        speech_requests = []
+        for text, _ in parts:
+            if text:
+                speech_requests.append(self._synthesize_segment(text, voice_id, previous_text))
+                previous_text = text
+        speech = iter(await asyncio.gather(*speech_requests))
+        
+        audio_parts = []
+        mp3_format = DEFAULT_MP3_FORMAT
+        for text, pause in parts:
+            if text:
+                audio = next(speech)
+                mp3_format = detect_mp3_format(audio) or mp3_format
+                audio_parts.append(audio)
+            if pause:
+                audio_parts.append(silent_mp3(pause, mp3_format))
+        return b"".join(audio_parts)
+
+    async def _synthesize_segment(self, text: str, voice_id: str, previous_text: Optional[str] = None) -> bytes:
+        # Waiting for a slot happens on the event loop, so queued segments don't hold executor threads
+        if self._request_slots is None:
+            self._request_slots = asyncio.Semaphore(self.max_concurrent_requests)
+        async with self._request_slots:
+            response = await asyncio.to_thread(self._request_speech, text, voice_id, previous_text)
+        if response.status_code != 200:
+            raise Exception(f"ElevenLabs API error: {response.status_code} - {response.text}")
+        return response.content
+
+    def _request_speech(self, text: str, voice_id: str, previous_text: Optional[str] = None) -> requests.Response:
+        # Direct API call to ElevenLabs
+        url = f"{self.base_url}/text-to-speech/{voice_id}?output_format={self.output_format}"
+        
+        headers = {
+            "Accept": "audio/mpeg",
+            "Content-Type": "application/json",
+            "xi-api-key": self.api_key
+        }
+        
+        data = {
+            "text": text,
+            "model_id": "eleven_multilingual_v2",
+            "voice_settings": {
+                "stability": 0.5,
+                "similarity_boost": 0.75
+            }
+        }
+        if previous_text:
+            # Keeps intonation continuous across separately synthesized segments
+            data["previous_text"] = previous_text
+        
+        return requests.post(url, json=data, headers=headers, timeout=self.request_timeout)
+
+    def save_audio(self, audio: bytes, filename: Optional[str] = None) -> str:
+        filename = filename or f"hypnosis_{uuid.uuid4().hex}.mp3"
+        filepath = f"static/audio/{filename}"
+        
+        os.makedirs("static/audio", exist_ok=True)
+        
+        with open(filepath, 'wb') as f:
+            f.write(audio)
+        
+        return f"/static/audio/{filename}"
+
     async def _generate_fallback(self, script: str, tone: Tone, voice_type: VoicePreference) -> str:
         """Fallback method that downloads and returns the fallback MP3 file"""
         try: